@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+
+class PhaseAggregates:
+    """Per-student phase totals shared by the raw and rollup-based matrices.
+
+    Subclasses fill `phase_sums` and `phase_counts`, students x phases arrays
+    whose columns follow segment_tracks/segment_phases (the curriculum's
+    non-empty phases in ID order).
+    """
+
+    def __init__(self, curriculum, students, career_paths):
+        self.curriculum = curriculum
+        self.students = list(students)
+        self.career_paths = np.array(career_paths, dtype=object)
+
+        segments = [(track, phase, ids) for (track, phase), ids in curriculum.phase_ranges.items() if len(ids)]
+        self.segment_tracks = np.array([track for track, _, _ in segments], dtype=object)
+        self.segment_phases = [phase for _, phase, _ in segments]
+        self._segment_starts = [ids.start for _, _, ids in segments]
+        self.phase_sums = np.zeros((len(self.students), len(segments)))
+        self.phase_counts = np.zeros((len(self.students), len(segments)), dtype=np.int64)
+        self._phase_averages = None
+
+    def __len__(self):
+        return len(self.students)
+
+    def fingerprint_parts(self):
+        """Return the values that identify this aggregate for figure caching"""
+        return (self.students, self.career_paths, self.phase_sums, self.phase_counts)
+
+    def student_averages(self):
+        """Return each student's mean completion over all stored subtopics"""
+        counts = self.phase_counts.sum(axis=1)
+        totals = self.phase_sums.sum(axis=1)
+        return np.divide(totals, counts, out=np.full(len(self.students), np.nan), where=counts > 0)
+
+    def phase_averages(self):
+        """Return a students x phases array of mean completion per phase.
+
+        A cell is NaN when the student has no entries in that phase or the
+        phase belongs to another career track.
+        """
+        if self._phase_averages is None:
+            averages = np.divide(self.phase_sums, self.phase_counts,
+                                 out=np.full(self.phase_sums.shape, np.nan), where=self.phase_counts > 0)
+            averages[self.career_paths[:, None] != self.segment_tracks[None, :]] = np.nan
+            self._phase_averages = averages
+        return self._phase_averages
+
+    def overall_averages(self):
+        """Return each student's mean over their phase averages"""
+        averages = self.phase_averages()
+        valid = ~np.isnan(averages)
+        counts = valid.sum(axis=1)
+        totals = np.where(valid, averages, 0).sum(axis=1)
+        return np.divide(totals, counts, out=np.full(len(self.students), np.nan), where=counts > 0)
+
+
+class ProgressMatrix(PhaseAggregates):
+    """Students x subtopics completion matrix built from stored progress.
+
+    Rows follow `students`, columns follow the curriculum's subtopic IDs and
+    cells hold completion percentages, with NaN where a student has no entry.
+    """
+
+    def __init__(self, curriculum, students, career_paths, values):
+        super().__init__(curriculum, students, career_paths)
+        self.values = values
+        if self._segment_starts and self.students:
+            present = ~np.isnan(values)
+            self.phase_sums = np.add.reduceat(np.where(present, values, 0), self._segment_starts, axis=1)
+            self.phase_counts = np.add.reduceat(present.astype(np.int64), self._segment_starts, axis=1)
+
+
+class RollupMatrix(PhaseAggregates):
+    """Per-student phase totals read from precomputed UserRollup objects.
+
+    Building it touches one (sum, count) pair per stored topic instead of
+    every subtopic entry.
+    """
+
+    def __init__(self, curriculum, students, career_paths, rollups):
+        super().__init__(curriculum, students, career_paths)
+        columns = {
+            (track, phase): column
+            for column, (track, phase) in enumerate(zip(self.segment_tracks, self.segment_phases))
+        }
+        rows, cols, totals, counts = [], [], [], []
+        for row, student in enumerate(self.students):
+            rollup = rollups.get(student)
+            if rollup is None:
+                continue
+            for (track, phase, _), (total, count) in rollup.topics.items():
+                column = columns.get((track, phase))
+                if column is not None:
+                    rows.append(row)
+                    cols.append(column)
+                    totals.append(total)
+                    counts.append(count)
+        if rows:
+            np.add.at(self.phase_sums, (rows, cols), totals)
+            np.add.at(self.phase_counts, (rows, cols), counts)
+
+
+@timed("aggregation.build_progress_matrix")
+def build_progress_matrix(user_data, curriculum, students=None):
+    """Build a ProgressMatrix for students (default: everyone with a career path)"""
+    if students is None:
+        students = [user for user, record in user_data.items() if record.get("career_path") is not None]
+
+    career_paths = [user_data[student].get("career_path") for student in students]
+    if students and len(curriculum):
+        vectors = [curriculum.completion_vector(user_data[student].get("progress", {})) for student in students]
+        values = np.array(vectors, dtype=np.float32)
+        values[values < 0] = np.nan
+    else:
+        values = np.full((len(students), len(curriculum)), np.nan, dtype=np.float32)
+    return ProgressMatrix(curriculum, students, career_paths, values)
+
+
+@timed("aggregation.build_rollup_matrix")
+def build_rollup_matrix(user_data, rollups, curriculum, students=None):
+    """Build a RollupMatrix for students (default: everyone with a career path)"""
+    if students is None:
+        students = [user for user, record in user_data.items() if record.get("career_path") is not None]
+    career_paths = [user_data[student].get("career_path") for student in students]
+    return RollupMatrix(curriculum, students, career_paths, rollups)
+
+
+@timed("aggregation.class_summary")
+def class_summary(matrix):
+    """Return one row per student with overall and per-phase progress.
+
+    Columns are Student, Career Path, Overall Progress and one column per
+    phase name; students without any stored progress are left out.
+    """
+    averages = matrix.phase_averages()
+    overall = matrix.overall_averages()
+    data = {
+        "Student": matrix.students,
+        "Career Path": matrix.career_paths,
+        "Overall Progress": overall
+    }
+    for phase in dict.fromkeys(matrix.segment_phases):
+        columns = [i for i, name in enumerate(matrix.segment_phases) if name == phase]
+        # Same-named phases of different tracks share one column; at most one applies per student
+        data[phase] = np.fmax.reduce(averages[:, columns], axis=1) if len(columns) > 1 else averages[:, columns[0]]
+
+    summary = pd.DataFrame(data)
+    summary = summary[~np.isnan(overall)].reset_index(drop=True)
+    return summary.dropna(axis=1, how="all")
+
+
+@timed("aggregation.phase_progress_table")
+def phase_progress_table(matrix):
+    """Return long-form Student, Career Path, Phase, Progress rows for every phase with data"""
+    averages = matrix.phase_averages()
+    rows, columns = np.nonzero(~np.isnan(averages))
+    return pd.DataFrame({
+        "Student": np.array(matrix.students, dtype=object)[rows],
+        "Career Path": matrix.career_paths[rows],
+        "Phase": np.array(matrix.segment_phases, dtype=object)[columns],
+        "Progress": averages[rows, columns]
+    })
+
+
+def career_averages(summary):
+    """Return mean overall progress per career path from a class_summary frame"""
+    return summary.groupby("Career Path")["Overall Progress"].mean().reset_index()
+
+
+def track_phase_averages(matrix):
+    """Return the class mean of each phase per career track"""
+    table = phase_progress_table(matrix)
+    return table.groupby(["Career Path", "Phase"], sort=False)["Progress"].mean().reset_index()
@@ -0,0 +1,210 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "milestone"
+REDACTED = "***"
+
+# Field names (or parts of them) whose values never reach a log handler
+SECRET_MARKERS = ("password", "passwd", "hash", "secret", "token", "api_key", "credential")
+
+_configure_lock = threading.RLock()
+_listener = None
+
+
+def is_secret(name):
+    name = str(name).lower()
+    return any(marker in name for marker in SECRET_MARKERS)
+
+
+def redact(value):
+    """Return value with every secret-named dict field replaced by REDACTED"""
+    if isinstance(value, dict):
+        return {key: REDACTED if is_secret(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """Redact secret fields before a record is queued"""
+
+    def filter(self, record):
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = redact(fields)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records per level, e.g. {logging.DEBUG: 0.1}; warnings and above are always kept"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return record.levelno >= logging.WARNING or rate >= 1.0 or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that drops records instead of blocking when it is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Copy the record with its message merged, keeping exc_info and the traceback text.
+
+        The stock prepare() formats the whole record into msg and clears
+        exc_info, which would bury the traceback inside the event string.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event and the record's fields"""
+
+    def format(self, record):
+        line = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        line.update(getattr(record, "fields", None) or {})
+        if record.exc_info or record.exc_text:
+            line["exc"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with key=value fields"""
+
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in (getattr(record, "fields", None) or {}).items())
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        line = f"{line} {fields}" if fields else line
+        if record.exc_info or record.exc_text:
+            line = f"{line}\n{record.exc_text or self.formatException(record.exc_info)}"
+        return line
+
+
+def _sample_rates():
+    rates = {}
+    for name in ("DEBUG", "INFO"):
+        value = os.environ.get(f"LOG_SAMPLE_{name}")
+        if value:
+            rates[getattr(logging, name)] = float(value)
+    return rates
+
+
+def configure_logging(level=None, log_file=None, fmt=None, sample_rates=None, queue_size=10000):
+    """Route the app's loggers through a bounded queue to a background listener thread.
+
+    Defaults come from LOG_LEVEL (INFO), LOG_FILE (stderr only),
+    LOG_FORMAT (json or text) and LOG_SAMPLE_DEBUG / LOG_SAMPLE_INFO
+    (fraction kept). Calling it again replaces the previous setup.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+
+        level = level or os.environ.get("LOG_LEVEL", "INFO")
+        log_file = log_file or os.environ.get("LOG_FILE")
+        fmt = fmt or os.environ.get("LOG_FORMAT", "json")
+        formatter = JSONFormatter() if fmt == "json" else TextFormatter()
+
+        handlers = [logging.StreamHandler(sys.stderr)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(_sample_rates() if sample_rates is None else sample_rates))
+        queue_handler.addFilter(RedactingFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        return queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+class StructuredLogger:
+    """Logger taking an event name plus keyword fields, e.g. log.info("user saved", username=name).
+
+    Disabled levels return before any formatting, so debug calls on hot
+    paths cost one level check.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, extra={"fields": fields}, exc_info=exc_info, stacklevel=3)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name):
+    """Return a StructuredLogger under the app's root logger, configuring logging on first use"""
+    with _configure_lock:
+        if _listener is None and not logging.getLogger(ROOT_LOGGER).handlers:
+            configure_logging()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
@@ -1,13 +1,23 @@
 import streamlit as st
 import hashlib
 
+from app_logging import get_logger
+
+log = get_logger("auth")
+
+
+def hash_password(password):
+    """Hash password using SHA-256"""
+    return hashlib.sha256(str(password).encode()).hexdigest()
+
+
 class Auth:
     def __init__(self, data_manager):
         self.data_manager = data_manager
 
     def hash_password(self, password):
         """Hash password using SHA-256"""
-        return hashlib.sha256(str(password).encode()).hexdigest()
+        return hash_password(password)
 
     def login(self, username, password, role="student"):
         """
@@ -18,19 +28,16 @@ class Auth:
 
         user = self.data_manager.get_user(username)
         if not user:
+            log.info("login failed", username=username, reason="unknown user")
             st.error(f"User {username} not found")
             return False
 
         hashed_input = self.hash_password(password)
         stored_hash = user["password"]
 
-        # Debug information
-        print(f"Input Password: {password}")
-        print(f"Hashed Input: {hashed_input}")
-        print(f"Stored Hash: {stored_hash}")
-
         if hashed_input == stored_hash:
             if role == "admin" and user["role"] != "admin":
+                log.warning("login refused", username=username, role=role, reason="not an admin")
                 st.error("You don't have admin privileges")
                 return False
             if role == "student" and user["role"] == "admin":
@@ -41,8 +48,10 @@ class Auth:
             st.session_state["username"] = username
             st.session_state["role"] = user["role"]
             st.session_state["authentication_status"] = True
+            log.info("login succeeded", username=username, role=user["role"])
             return True
 
+        log.info("login failed", username=username, reason="invalid password")
         st.error("Invalid password")
         return False
 
@@ -57,18 +66,9 @@ class Auth:
         if password != confirm_password:
             return False
 
-        if self.data_manager.get_user(username):
-            return False
-
-        # Hash password and save user
+        # Hash password and create the user with empty progress in one write
         hashed_password = self.hash_password(password)
-        success = self.data_manager.save_user(username, hashed_password, "student")
-        if success:
-            # Initialize empty progress data for new user
-            self.data_manager.initialize_user_progress(username)
-            return True
-
-        return False
+        return self.data_manager.register_user(username, hashed_password, "student")
 
     def logout(self):
         """Clear all authentication related session state"""
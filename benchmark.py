@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _timings(func, repeat):
+    """Run func repeat times; return the durations in seconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _summarize(name, size, durations, operations=1):
+    ordered = sorted(durations)
+    return {
+        "name": name,
+        "students": size,
+        "runs": len(durations),
+        "median_ms": round(statistics.median(ordered) * 1000 / operations, 3),
+        "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000 / operations, 3),
+        "ops_per_s": round(operations / statistics.median(ordered), 1)
+    }
+
+
+def generate_cohort(manager, size, fill=0.3, seed=0):
+    """Import size synthetic students with random progress on the real curriculum; return their usernames"""
+    from auth import hash_password
+
+    rng = random.Random(seed)
+    curriculum = manager.get_curriculum()
+    tracks = list(curriculum.tracks())
+    password = hash_password("benchmark")
+    start = datetime(2025, 1, 1)
+
+    accounts, profiles, progress = {"admin": {"password": password, "role": "admin"}}, {}, {}
+    for i in range(size):
+        username = f"student{i:05d}"
+        track = rng.choice(tracks)
+        accounts[username] = {"password": password, "role": "student"}
+        profiles[username] = {"career_path": track, "course_type": "Full Course"}
+        entries = {}
+        for subtopic_id in curriculum.track_range(track):
+            if rng.random() < fill:
+                timestamp = start + timedelta(minutes=rng.randrange(500000))
+                entries[curriculum.key_for_id(subtopic_id)] = {
+                    "completion": rng.randrange(101),
+                    "deadlines": [str((timestamp + timedelta(days=rng.randrange(60))).date())],
+                    "timestamp": timestamp.isoformat()
+                }
+        progress[username] = entries
+    if not manager.import_records(accounts, profiles, progress):
+        raise RuntimeError("Importing the synthetic cohort failed")
+    return [f"student{i:05d}" for i in range(size)]
+
+
+def bench_storage(manager, students, operations, repeat):
+    """Time DataManager.save_progress and get_student_progress on random students"""
+    rng = random.Random(1)
+    curriculum = manager.get_curriculum()
+    user_data = manager.get_all_user_data()
+    targets = []
+    for _ in range(operations):
+        username = rng.choice(students)
+        track = user_data[username]["career_path"]
+        _, phase, topic, subtopic = curriculum.parts_for_id(rng.choice(list(curriculum.track_range(track))))
+        targets.append((username, track, topic, subtopic, phase))
+
+    def save():
+        for username, track, topic, subtopic, phase in targets:
+            manager.save_progress(username, track, topic, subtopic, rng.randrange(101), phase)
+
+    def load():
+        for username, *_ in targets:
+            manager.get_student_progress(username)
+
+    return [
+        _summarize("storage.save_progress", len(students), _timings(save, repeat), operations),
+        _summarize("storage.get_student_progress", len(students), _timings(load, repeat), operations),
+        _summarize("storage.get_all_user_data", len(students), _timings(manager.get_all_user_data, repeat))
+    ]
+
+
+def bench_aggregation(manager, students, repeat):
+    """Time the admin Class Summary and Student Comparison aggregations"""
+    from aggregation import build_progress_matrix, build_rollup_matrix, class_summary, phase_progress_table
+
+    curriculum = manager.get_curriculum()
+    user_data = manager.get_all_user_data()
+    rollups = manager.get_rollups(students, user_data)
+
+    return [
+        _summarize("aggregation.rollup_summary", len(students), _timings(
+            lambda: class_summary(build_rollup_matrix(
+                user_data, manager.get_rollups(students, user_data), curriculum, students
+            )), repeat)),
+        _summarize("aggregation.rollup_phase_table", len(students), _timings(
+            lambda: phase_progress_table(build_rollup_matrix(user_data, rollups, curriculum, students)), repeat)),
+        _summarize("aggregation.raw_summary", len(students), _timings(
+            lambda: class_summary(build_progress_matrix(user_data, curriculum, students)), repeat))
+    ]
+
+
+def bench_figures(manager, students, repeat):
+    """Time building the admin figures with the figure cache cleared, and again with it warm"""
+    from aggregation import build_rollup_matrix, career_averages, class_summary, phase_progress_table
+    from figure_cache import figure_cache
+    from visualization import (create_average_progress_chart, create_career_average_chart,
+                               create_career_distribution_chart, create_comparison_chart, create_progress_histogram)
+
+    curriculum = manager.get_curriculum()
+    user_data = manager.get_all_user_data()
+    matrix = build_rollup_matrix(user_data, manager.get_rollups(students, user_data), curriculum, students)
+    summary = class_summary(matrix)
+    comparison = phase_progress_table(matrix)
+
+    def build():
+        create_career_distribution_chart(summary)
+        create_career_average_chart(career_averages(summary))
+        create_progress_histogram(summary)
+        create_average_progress_chart(matrix)
+        create_comparison_chart(comparison)
+
+    def cold():
+        figure_cache.clear()
+        build()
+
+    cold_row = _summarize("figures.admin_cold", len(students), _timings(cold, repeat))
+    # Serialized size of the comparison figure, which must stay bounded as the cohort grows
+    cold_row["payload_kb"] = round(len(create_comparison_chart(comparison).to_json()) / 1024, 1)
+    return [cold_row, _summarize("figures.admin_cached", len(students), _timings(build, repeat))]
+
+
+def bench_app(students, repeat):
+    """Time headless AppTest reruns of the student dashboard and the admin overview"""
+    from streamlit.testing.v1 import AppTest
+
+    results = []
+    for name, username, role in (("app.student_rerun", students[0], "student"), ("app.admin_rerun", "admin", "admin")):
+        app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=600)
+        app.session_state["logged_in"] = True
+        app.session_state["username"] = username
+        app.session_state["role"] = role
+        app.session_state["current_page"] = "main"
+        results.append(_summarize(f"{name}_first", len(students), _timings(app.run, 1)))
+        if app.exception:
+            raise RuntimeError(f"{name} raised: {app.exception[0].message}")
+        results.append(_summarize(name, len(students), _timings(app.run, repeat)))
+    return results
+
+
+def run_benchmarks(sizes, backend="json", repeat=5, operations=200, app=True):
+    """Benchmark every hot path against fresh synthetic cohorts; return result rows"""
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy(os.path.join(APP_DIR, "topics.json"), directory)
+            cwd = os.getcwd()
+            os.chdir(directory)
+            os.environ["TRACKER_STORAGE"] = backend
+            try:
+                from data_manager import DataManager
+                from figure_cache import figure_cache
+
+                figure_cache.clear()
+                manager = DataManager()
+                start = time.perf_counter()
+                students = generate_cohort(manager, size)
+                results.append(_summarize("setup.import_cohort", size, [time.perf_counter() - start]))
+
+                results.extend(bench_storage(manager, students, operations, repeat))
+                results.extend(bench_aggregation(manager, students, repeat))
+                results.extend(bench_figures(manager, students, repeat))
+                if app:
+                    results.extend(bench_app(students, repeat))
+            finally:
+                os.chdir(cwd)
+        print(f"Finished {size} students", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return (name, students, baseline ms, current ms) for results slower than baseline by more than threshold"""
+    previous = {(row["name"], row["students"]): row["median_ms"] for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row["name"], row["students"]))
+        if before and row["median_ms"] > before * (1 + threshold):
+            regressions.append((row["name"], row["students"], before, row["median_ms"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+
+    parser = argparse.ArgumentParser(description="Benchmark storage, aggregation, figures and app reruns")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Cohort sizes")
+    parser.add_argument("--backend", choices=["json", "eventlog", "sqlite"], default="json")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per measurement")
+    parser.add_argument("--operations", type=int, default=200, help="Saves and loads per storage run")
+    parser.add_argument("--no-app", action="store_true", help="Skip the AppTest reruns")
+    parser.add_argument("-o", "--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Compare with a previous --output file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.backend, args.repeat, args.operations, not args.no_app)
+
+    print(f"{'benchmark':<32} {'students':>8} {'median ms':>10} {'p95 ms':>10} {'ops/s':>10} {'payload KB':>10}")
+    for row in results:
+        print(f"{row['name']:<32} {row['students']:>8} {row['median_ms']:>10} {row['p95_ms']:>10} "
+              f"{row['ops_per_s']:>10} {row.get('payload_kb', ''):>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"backend": args.backend, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for name, students, before, after in regressions:
+            print(f"REGRESSION {name} ({students} students): {before} ms -> {after} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
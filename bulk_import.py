@@ -0,0 +1,216 @@
+import argparse
+import csv
+import sys
+from datetime import date, datetime
+
+from auth import hash_password
+from storage import progress_key
+from write_behind import FlushTimeoutError
+
+ROLES = ("student", "admin")
+
+
+class ImportReport:
+    """Counts and row-level errors from one bulk import"""
+
+    def __init__(self):
+        self.users = 0
+        self.progress = 0
+        self.errors = []
+        self.saved = False
+
+    def error(self, source, line, message):
+        self.errors.append((source, line, message))
+
+    def summary(self):
+        """Return a one-line description of the import"""
+        status = "Imported" if self.saved else "Validated"
+        return f"{status} {self.users} users and {self.progress} progress entries with {len(self.errors)} errors"
+
+
+def _clean(row):
+    return {(key or "").strip().lower().replace(" ", "_"): (value or "").strip() for key, value in row.items()}
+
+
+def read_users(rows, curriculum, manager, report):
+    """Validate users CSV rows; return (accounts, profiles, {username: career_path})"""
+    accounts, profiles, career_paths = {}, {}, {}
+    tracks = curriculum.tracks()
+    for line, row in enumerate(rows, start=2):
+        row = _clean(row)
+        username = row.get("username", "")
+        if not username:
+            report.error("users", line, "missing username")
+            continue
+        if username in career_paths:
+            report.error("users", line, f"duplicate username {username}")
+            continue
+        role = row.get("role") or "student"
+        if role not in ROLES:
+            report.error("users", line, f"unknown role {role}")
+            continue
+        career_path = row.get("career_path") or None
+        if career_path is not None and career_path not in tracks:
+            report.error("users", line, f"unknown career path {career_path}")
+            continue
+
+        existing = manager.get_user(username)
+        if existing is None:
+            if row.get("password_hash"):
+                password = row["password_hash"]
+            elif row.get("password"):
+                password = hash_password(row["password"])
+            else:
+                report.error("users", line, f"new user {username} needs a password or password_hash")
+                continue
+            accounts[username] = {"password": password, "role": role}
+
+        fields = {field: row[field] for field in ("career_path", "course_type", "phone", "email") if row.get(field)}
+        if fields:
+            profiles[username] = fields
+        career_paths[username] = career_path
+    return accounts, profiles, career_paths
+
+
+def read_progress(rows, report):
+    """Validate progress CSV rows; return {username: {path: [(line, timestamp, completion, deadline)]}}.
+
+    path is the row's (track, phase, topic, subtopic). Track and phase may
+    be empty; they are resolved against the user's career path later.
+    """
+    history = {}
+    for line, row in enumerate(rows, start=2):
+        row = _clean(row)
+        username = row.get("username", "")
+        if not username:
+            report.error("progress", line, "missing username")
+            continue
+        try:
+            value = float(row.get("completion", ""))
+            # Range first: inf and nan fail it instead of overflowing int()
+            if not 0 <= value <= 100:
+                report.error("progress", line, f"completion {row.get('completion')} outside 0-100")
+                continue
+            completion = int(value)
+        except (ValueError, OverflowError):
+            report.error("progress", line, f"invalid completion {row.get('completion')!r}")
+            continue
+        deadline = row.get("deadline") or None
+        timestamp = row.get("timestamp") or None
+        try:
+            if deadline:
+                deadline = str(date.fromisoformat(deadline))
+            if timestamp:
+                timestamp = datetime.fromisoformat(timestamp).isoformat()
+        except ValueError as e:
+            report.error("progress", line, str(e))
+            continue
+        path = (row.get("track", ""), row.get("phase", ""), row.get("topic", ""), row.get("subtopic", ""))
+        if not path[2] or not path[3]:
+            report.error("progress", line, "missing topic or subtopic")
+            continue
+        history.setdefault(username, {}).setdefault(path, []).append((line, timestamp, completion, deadline))
+    return history
+
+
+def _resolve_key(curriculum, track, phase, topic, subtopic):
+    """Return the canonical progress key for a curriculum subtopic, or None if unknown"""
+    key = curriculum.canonical_key(progress_key(track, phase or None, topic, subtopic))
+    return key if curriculum.id_for_key(key) is not None else None
+
+
+def merge_history(entry, rows):
+    """Fold historical rows into a copy of a stored entry, oldest first"""
+    entry = {name: value for name, value in (entry or {}).items() if name != "version"}
+    deadlines = list(entry.get("deadlines", []))
+    for _, timestamp, completion, deadline in sorted(rows, key=lambda row: row[1] or ""):
+        entry["completion"] = completion
+        if deadline and (not deadlines or deadlines[-1] != deadline):
+            deadlines.append(deadline)
+        entry["timestamp"] = timestamp or datetime.now().isoformat()
+    if deadlines:
+        entry["deadlines"] = deadlines
+    return entry
+
+
+def bulk_import(manager, users_rows=None, progress_rows=None, skip_invalid=False, dry_run=False):
+    """Validate and import users and historical progress from CSV rows in one batched write.
+
+    users_rows and progress_rows are iterables of dicts (e.g. csv.DictReader).
+    Any invalid row aborts the whole import unless skip_invalid is set.
+    """
+    report = ImportReport()
+    curriculum = manager.get_curriculum()
+
+    accounts, profiles, career_paths = ({}, {}, {}) if users_rows is None else \
+        read_users(users_rows, curriculum, manager, report)
+    history = {} if progress_rows is None else read_progress(progress_rows, report)
+
+    # Existing records supply career paths for unlisted users and the entries to merge into
+    stored = {}
+    for records in manager.iter_user_records([u for u in history if u in career_paths or manager.get_user(u)]):
+        stored.update(records)
+
+    progress = {}
+    for username, paths in history.items():
+        if username not in career_paths and username not in stored:
+            for rows in paths.values():
+                report.error("progress", rows[0][0], f"unknown user {username}")
+            continue
+        record = stored.get(username, {})
+        career_path = career_paths.get(username) or record.get("career_path")
+        entries = {}
+        for (track, phase, topic, subtopic), rows in paths.items():
+            key = _resolve_key(curriculum, track or career_path, phase, topic, subtopic)
+            if key is None:
+                path = " / ".join(part for part in (track or career_path or "?", phase, topic, subtopic) if part)
+                report.error("progress", rows[0][0], f"{path} is not in the curriculum")
+                continue
+            entries[key] = merge_history(entries.get(key) or record.get("progress", {}).get(key), rows)
+        if entries:
+            progress[username] = entries
+
+    report.users = len(accounts)
+    report.progress = sum(len(entries) for entries in progress.values())
+    if dry_run or (report.errors and not skip_invalid):
+        return report
+    try:
+        report.saved = manager.import_records(accounts, profiles, progress)
+    except FlushTimeoutError as e:
+        report.error("import", "", str(e))
+    return report
+
+
+if __name__ == "__main__":
+    from data_manager import DataManager
+
+    parser = argparse.ArgumentParser(description="Bulk import students and progress from CSV")
+    parser.add_argument("--users", help="CSV with username, password or password_hash, role, career_path, "
+                                        "course_type, and optional phone and email")
+    parser.add_argument("--progress", help="CSV with username, track, phase, topic, subtopic, completion, deadline, timestamp")
+    parser.add_argument("--skip-invalid", action="store_true", help="Import the valid rows even if some are invalid")
+    parser.add_argument("--dry-run", action="store_true", help="Only validate the files")
+    args = parser.parse_args()
+    if not args.users and not args.progress:
+        parser.error("pass --users and/or --progress")
+
+    manager = DataManager()
+    users_file = open(args.users, newline="", encoding="utf-8-sig") if args.users else None
+    progress_file = open(args.progress, newline="", encoding="utf-8-sig") if args.progress else None
+    try:
+        report = bulk_import(
+            manager,
+            csv.DictReader(users_file) if users_file else None,
+            csv.DictReader(progress_file) if progress_file else None,
+            args.skip_invalid, args.dry_run
+        )
+    finally:
+        for f in (users_file, progress_file):
+            if f:
+                f.close()
+
+    for source, line, message in report.errors:
+        print(f"{source} line {line}: {message}", file=sys.stderr)
+    print(report.summary())
+    if (report.errors and not args.skip_invalid) or not (report.saved or args.dry_run):
+        sys.exit(1)
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+
+class ChangeTracker:
+    """Record which user_data entries actually changed during one script run.
+
+    The dashboard edits its in-memory copy of user_data through this class and
+    calls DataManager.save_changes once at the end of the run, so only the
+    touched profile fields and subtopic entries are written. A run that
+    changes nothing writes nothing.
+    """
+
+    def __init__(self):
+        self._fields = {}
+        self._progress = {}
+        self._conflicts = {}
+
+    def has_changes(self):
+        """Return True when at least one field or entry is dirty"""
+        return bool(self._fields or self._progress)
+
+    def set_field(self, user_data, username, field, value):
+        """Set a profile field and mark it dirty if the value changed"""
+        record = user_data.setdefault(username, {"career_path": None, "progress": {}})
+        if record.get(field) == value:
+            return False
+        record[field] = value
+        self._fields.setdefault(username, set()).add(field)
+        return True
+
+    def update_progress(self, user_data, username, key, **values):
+        """Merge values into a subtopic entry and mark it dirty if anything changed.
+
+        The entry timestamp is only refreshed when a value really changes. The
+        entry keeps the version it was loaded with (0 if new) so the save
+        is rejected if another session wrote it in the meantime.
+        """
+        progress = user_data.setdefault(username, {"career_path": None, "progress": {}}).setdefault("progress", {})
+        entry = progress.get(key, {})
+        if all(entry.get(name) == value for name, value in values.items()):
+            return False
+        progress[key] = {"version": 0, **entry, **values, "timestamp": datetime.now().isoformat()}
+        self.mark_progress(username, key)
+        return True
+
+    def mark_progress(self, username, key):
+        """Mark an entry that was modified in place as dirty"""
+        self._progress.setdefault(username, set()).add(key)
+
+    def dirty_fields(self):
+        """Return {username: set of profile fields} changed in this run"""
+        return self._fields
+
+    def dirty_progress(self):
+        """Return {username: set of progress keys} changed in this run"""
+        return self._progress
+
+    def record_conflicts(self, username, keys):
+        """Remember entries whose save lost to a concurrent writer"""
+        self._conflicts.setdefault(username, set()).update(keys)
+        if username in self._progress:
+            self._progress[username].difference_update(keys)
+
+    def conflicts(self):
+        """Return {username: set of progress keys} rejected as stale in this run"""
+        return self._conflicts
+
+    def clear(self):
+        """Forget all recorded changes (conflicts are kept for reporting)"""
+        self._fields = {}
+        self._progress = {}
@@ -0,0 +1,174 @@
+import os
+import threading
+from array import array
+from types import MappingProxyType
+
+from storage import build_key_index, load_json, progress_key
+
+_EMPTY = MappingProxyType({})
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class Curriculum:
+    """Immutable, pre-indexed view of topics.json.
+
+    Tracks map to read-only {phase: {topic: (subtopic, ...)}} mappings, so one
+    instance can be shared safely by every Streamlit session in the process.
+
+    Every (track, phase, topic, subtopic) also gets a stable integer ID in
+    file order, so each track, phase and topic covers a contiguous ID range
+    and a user's progress can be held in a flat array indexed by ID.
+    """
+
+    def __init__(self, topics):
+        tracks = {}
+        entries = []
+        track_ranges = {}
+        phase_ranges = {}
+        topic_ranges = {}
+        for track, phases in topics.items():
+            track_start = len(entries)
+            track_phases = {}
+            for phase, phase_topics in phases.items():
+                phase_start = len(entries)
+                phase_map = {}
+                for topic, subtopics in phase_topics.items():
+                    if not isinstance(subtopics, list):
+                        continue
+                    topic_start = len(entries)
+                    phase_map[topic] = tuple(subtopics)
+                    entries.extend((track, phase, topic, subtopic) for subtopic in subtopics)
+                    topic_ranges[(track, phase, topic)] = range(topic_start, len(entries))
+                phase_ranges[(track, phase)] = range(phase_start, len(entries))
+                track_phases[phase] = MappingProxyType(phase_map)
+            track_ranges[track] = range(track_start, len(entries))
+            tracks[track] = MappingProxyType(track_phases)
+
+        self._tracks = MappingProxyType(tracks)
+        self._entries = tuple(entries)
+        self._keys = tuple(progress_key(*entry) for entry in entries)
+        self._track_ranges = MappingProxyType(track_ranges)
+        self._phase_ranges = MappingProxyType(phase_ranges)
+        self._topic_ranges = MappingProxyType(topic_ranges)
+        self._key_index = MappingProxyType(build_key_index(topics))
+
+        ids = {}
+        for subtopic_id, (track, phase, topic, subtopic) in enumerate(entries):
+            ids[self._keys[subtopic_id]] = subtopic_id
+            # Phase-less keys written by DataManager.save_progress share the ID
+            ids.setdefault(progress_key(track, None, topic, subtopic), subtopic_id)
+        self._ids = MappingProxyType(ids)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def tracks(self):
+        """Return the career track names"""
+        return tuple(self._tracks)
+
+    def get_topics(self, track):
+        """Return the read-only {phase: {topic: subtopics}} mapping for a track"""
+        return self._tracks.get(track, _EMPTY)
+
+    @property
+    def key_index(self):
+        """Read-only map of flat progress keys to (track, phase, topic, subtopic)"""
+        return self._key_index
+
+    def parts_for_key(self, key):
+        """Return the (track, phase, topic, subtopic) parts for a flat progress key"""
+        return self._key_index.get(key, ("", "", "", key))
+
+    def id_for_key(self, key):
+        """Return the subtopic ID for a flat progress key, or None if unknown"""
+        return self._ids.get(key)
+
+    def canonical_key(self, key):
+        """Return the phase-qualified key for a known subtopic key, or key itself"""
+        subtopic_id = self._ids.get(key)
+        return self._keys[subtopic_id] if subtopic_id is not None else key
+
+    def key_for_id(self, subtopic_id):
+        """Return the canonical flat progress key for a subtopic ID"""
+        return self._keys[subtopic_id]
+
+    def parts_for_id(self, subtopic_id):
+        """Return the (track, phase, topic, subtopic) parts for a subtopic ID"""
+        return self._entries[subtopic_id]
+
+    def track_range(self, track):
+        """Return the range of subtopic IDs in a track"""
+        return self._track_ranges.get(track, range(0))
+
+    def phase_range(self, track, phase):
+        """Return the range of subtopic IDs in a phase"""
+        return self._phase_ranges.get((track, phase), range(0))
+
+    @property
+    def phase_ranges(self):
+        """Read-only map of (track, phase) to its subtopic ID range, in ID order"""
+        return self._phase_ranges
+
+    def topic_range(self, track, phase, topic):
+        """Return the range of subtopic IDs in a topic"""
+        return self._topic_ranges.get((track, phase, topic), range(0))
+
+    def completion_vector(self, progress):
+        """Return a user's completion values as an array indexed by subtopic ID.
+
+        Subtopics without a stored entry hold -1 so callers can tell "not
+        started" apart from an explicit 0%.
+        """
+        vector = array('h', [-1]) * len(self._entries)
+        for key, entry in progress.items():
+            subtopic_id = self._ids.get(key)
+            # The canonical phase-qualified key wins over a phase-less duplicate
+            if subtopic_id is not None and (vector[subtopic_id] < 0 or self._keys[subtopic_id] == key):
+                vector[subtopic_id] = entry.get("completion", 0)
+        return vector
+
+
+    def nested_progress(self, progress):
+        """Derive the {track: {topic: {subtopic: {"progress", "timestamp"}}}} view of flat entries.
+
+        Keys outside the curriculum are skipped; the canonical key wins over
+        a phase-less duplicate of the same subtopic.
+        """
+        nested = {}
+        for key, entry in progress.items():
+            subtopic_id = self._ids.get(key)
+            if subtopic_id is None:
+                continue
+            track, _, topic, subtopic = self._entries[subtopic_id]
+            subtopics = nested.setdefault(track, {}).setdefault(topic, {})
+            if subtopic in subtopics and self._keys[subtopic_id] != key:
+                continue
+            subtopics[subtopic] = {
+                "progress": entry.get("completion", 0),
+                "timestamp": entry.get("timestamp")
+            }
+        return nested
+
+
+def load_curriculum(topics_file="topics.json"):
+    """Return the shared Curriculum for topics_file.
+
+    The file is only re-read and re-indexed when its mtime or size changes;
+    otherwise every caller in the process gets the same cached instance.
+    """
+    try:
+        stat = os.stat(topics_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        signature = None
+
+    path = os.path.abspath(topics_file)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        curriculum = Curriculum(load_json(topics_file))
+        _cache[path] = (signature, curriculum)
+        return curriculum
@@ -1,26 +1,50 @@
-import json
+import copy
 import os
 from datetime import datetime
 import hashlib
 
+from app_logging import get_logger
+from curriculum import load_curriculum
+from deadlines import DeadlineIndex, drop_index, shared_index, update_shared
+from locking import ConcurrentUpdateError
+from perf import InstrumentedBackend
+from rollups import UserRollup
+from storage import create_backend, load_json, progress_key, save_json
+from write_behind import FlushTimeoutError, shared_queue
+
+log = get_logger("data_manager")
+
 class DataManager:
-    def __init__(self):
-        """Initialize file paths and storage."""
-        self.users_file = "users.json"
-        self.progress_file = "progress.json"
+    def __init__(self, backend=None, write_behind=None):
+        """Initialize file paths and storage.
+
+        With write_behind (default: TRACKER_WRITE_BEHIND=1), progress and
+        profile saves are queued for a shared background writer instead of
+        being written on the calling thread.
+        """
         self.topics_file = "topics.json"
         self.deadlines_file = "deadlines.json"
-        self.user_data_file = "user_data.json"
         self._initialize_storage()
+        # Every backend call is timed for the profiling panel
+        self.backend = InstrumentedBackend(backend or create_backend())
+
+        # Identifies the store for the caches and queues shared by every session in this process
+        self.store_key = id(backend) if backend else (os.environ.get("TRACKER_STORAGE", "json"), os.getcwd())
+
+        # Longest a flush before a whole-store read or write may block the calling script
+        self.flush_timeout = float(os.environ.get("TRACKER_FLUSH_TIMEOUT", 10))
+        if write_behind is None:
+            write_behind = os.environ.get("TRACKER_WRITE_BEHIND", "0") not in ("", "0")
+        self.writer = None
+        if write_behind:
+            self.writer = shared_queue(self.store_key, lambda: self.backend,
+                                       float(os.environ.get("TRACKER_WRITE_INTERVAL", 0.2)))
 
     def _initialize_storage(self):
         """Ensure necessary files exist with proper structure"""
         files = {
-            self.users_file: {},
-            self.progress_file: {},
             self.topics_file: self._get_default_topics(),
-            self.deadlines_file: {},
-            self.user_data_file: {}
+            self.deadlines_file: {}
         }
 
         for file_path, default_data in files.items():
@@ -39,138 +63,266 @@ class DataManager:
     def save_user(self, username, hashed_password, role="student"):
         """Save a new user with hashed password"""
         try:
-            users = self._load_json(self.users_file)
-            users[username] = {
-                "password": hashed_password,
-                "role": role
-            }
-            self._save_json(self.users_file, users)
-            print(f"Successfully saved user: {username}")  # Debug logging
+            self.backend.save_user(username, hashed_password, role)
+            log.info("user saved", username=username, role=role)
+            return True
+        except Exception:
+            log.exception("saving user failed", username=username)
+            return False
+
+    def register_user(self, username, hashed_password, role="student"):
+        """Create a user with an empty profile in one write; False if the name is taken"""
+        try:
+            if not self.backend.register_user(username, hashed_password, role):
+                return False
+            log.info("user registered", username=username, role=role)
             return True
-        except Exception as e:
-            print(f"Error saving user: {e}")
+        except Exception:
+            log.exception("registering user failed", username=username)
             return False
 
     def get_user(self, username):
         """Retrieve user details"""
-        users = self._load_json(self.users_file)
-        return users.get(username)
+        return self.backend.get_user(username)
 
     def initialize_user_progress(self, username):
         """Initialize empty progress data for new user"""
         try:
-            print(f"Initializing user progress for: {username}")  # Debug log
-
-            # Initialize in user_data.json
-            user_data = self._load_json(self.user_data_file)
-            if username not in user_data:
-                user_data[username] = {
-                    "career_path": None,
-                    "progress": {}
-                }
-                self._save_json(self.user_data_file, user_data)
-                print(f"Created user data for: {username}")  # Debug log
-
-            # Initialize in progress.json
-            progress = self._load_json(self.progress_file)
-            if username not in progress:
-                progress[username] = {}
-                self._save_json(self.progress_file, progress)
-                print(f"Created progress data for: {username}")  # Debug log
-
-            # Verify data was saved
-            saved_user_data = self._load_json(self.user_data_file)
-            saved_progress = self._load_json(self.progress_file)
-            print(f"Verification - User data exists: {username in saved_user_data}")
-            print(f"Verification - Progress data exists: {username in saved_progress}")
-
+            self.backend.initialize_user(username)
+            log.debug("user progress initialized", username=username)
             return True
-        except Exception as e:
-            print(f"Error initializing user progress: {e}")
+        except Exception:
+            log.exception("initializing user progress failed", username=username)
             return False
 
+    def get_curriculum(self):
+        """Return the cached, pre-indexed curriculum from topics.json"""
+        return load_curriculum(self.topics_file)
+
     def get_topics(self, track):
         """Return topics for a given career track"""
-        topics = self._load_json(self.topics_file)
-        return topics.get(track, {})
+        return self.get_curriculum().get_topics(track)
 
-    def save_progress(self, username, track, topic, subtopic, progress_value):
+    def save_progress(self, username, track, topic, subtopic, progress_value, phase=None):
         """Save student progress with proper structure"""
         try:
-            # Update progress.json
-            progress_data = self._load_json(self.progress_file)
-            if username not in progress_data:
-                progress_data[username] = {}
-            if track not in progress_data[username]:
-                progress_data[username][track] = {}
-            if topic not in progress_data[username][track]:
-                progress_data[username][track][topic] = {}
-
-            progress_data[username][track][topic][subtopic] = {
-                "progress": progress_value,
-                "timestamp": datetime.now().isoformat()
-            }
-            self._save_json(self.progress_file, progress_data)
-
-            # Update user_data.json
-            user_data = self._load_json(self.user_data_file)
-            if username not in user_data:
-                user_data[username] = {"career_path": track, "progress": {}}
-
-            progress_key = f"{track}_{topic}_{subtopic}"
-            user_data[username]["progress"][progress_key] = {
-                "completion": progress_value,
-                "timestamp": datetime.now().isoformat()
-            }
-            self._save_json(self.user_data_file, user_data)
-
+            # Resolve the phase so the entry lands on the dashboard's canonical key
+            curriculum = self.get_curriculum()
+            key = curriculum.canonical_key(progress_key(track, phase, topic, subtopic))
+            parts = curriculum.key_index.get(key, (track, phase or "", topic, subtopic))
+            while True:
+                # Only completion and timestamp change; deadlines, link and editing are kept
+                stored = (self.get_user_record(username) or {}).get("progress", {}).get(key, {})
+                entry = {**stored, "completion": progress_value, "timestamp": datetime.now().isoformat(),
+                         "version": stored.get("version", 0)}
+                try:
+                    if self.writer:
+                        self.writer.submit_progress(username, [(key, parts, entry)])
+                    else:
+                        self.backend.save_progress_entry(username, key, parts, entry)
+                    break
+                except ConcurrentUpdateError:
+                    # Another session wrote this entry since we read it; merge onto its values
+                    log.debug("concurrent update, retrying", username=username, key=key)
+            self._index_deadlines(username, {key: entry})
             return True
-        except Exception as e:
-            print(f"Error saving progress: {e}")
+        except Exception:
+            log.exception("saving progress failed", username=username, track=track, topic=topic, subtopic=subtopic)
             return False
 
     def get_student_progress(self, username):
-        """Retrieve student progress"""
-        print(f"Getting progress for student: {username}")  # Debug log
-        progress_data = self._load_json(self.progress_file)
-        progress = progress_data.get(username, {})
-        print(f"Found progress data: {bool(progress)}")  # Debug log
+        """Retrieve student progress as a nested {track: {topic: {subtopic: ...}}} view"""
+        record = self.get_user_record(username) or {}
+        progress = self.get_curriculum().nested_progress(record.get("progress", {}))
+        log.debug("student progress loaded", username=username, tracks=len(progress))
         return progress
 
     def get_all_students_progress(self):
-        """Retrieve progress data for all students"""
-        return self._load_json(self.progress_file)
+        """Retrieve the nested progress view for all students"""
+        curriculum = self.get_curriculum()
+        return {
+            username: curriculum.nested_progress(record.get("progress", {}))
+            for username, record in self.get_all_user_data().items()
+        }
+
+    def get_user_record(self, username):
+        """Retrieve one user's profile and flat progress without loading anyone else's"""
+        record = self.backend.get_user_record(username)
+        if self.writer:
+            # Queued writes are not stored yet; show them anyway
+            user_data = self.writer.overlay({username: record} if record is not None else {}, {username})
+            record = user_data.get(username)
+        return record
+
+    def get_all_user_data(self):
+        """Retrieve profile and flat progress data for every user"""
+        user_data = self.backend.get_all_user_records()
+        return self.writer.overlay(user_data) if self.writer else user_data
+
+    def flush(self, timeout=None):
+        """Wait until queued writes are stored; True at once without write-behind"""
+        return self.writer.flush(timeout) if self.writer else True
+
+    def _flush_queued(self):
+        """Flush within flush_timeout or raise FlushTimeoutError instead of blocking"""
+        if not self.flush(self.flush_timeout):
+            log.error("flushing queued writes timed out", timeout=self.flush_timeout)
+            raise FlushTimeoutError(f"Queued saves were not stored within {self.flush_timeout:g} seconds")
+
+    def get_deadline_index(self):
+        """Return the shared DeadlineIndex for this store, building it from every record on first use"""
+        def build():
+            self._flush_queued()
+            return DeadlineIndex.build(self.iter_user_records())
+
+        return shared_index(self.store_key, build, float(os.environ.get("TRACKER_DEADLINE_REFRESH", 300)))
+
+    def _index_deadlines(self, username, entries):
+        """Apply saved {progress_key: entry} values to the deadline index if one has been built"""
+        update_shared(self.store_key, username, entries)
+
+    def iter_user_records(self, usernames=None, chunk_size=500):
+        """Yield {username: record} chunks so large cohorts can be processed in bounded memory"""
+        return self.backend.iter_user_records(usernames, chunk_size)
+
+    def query_students(self, query):
+        """Return one StudentPage of students matching a StudentQuery"""
+        return self.backend.query_students(query, self.get_curriculum().key_index)
+
+    def query_rows(self, query, chunk_size=1000):
+        """Return the summary rows on every page of a StudentQuery, in its order"""
+        rows = []
+        page_query = copy.copy(query)
+        page_query.page, page_query.page_size = 0, chunk_size
+        while True:
+            page = self.query_students(page_query)
+            rows.extend(page.rows)
+            if len(rows) >= page.total or not page.rows:
+                return rows
+            page_query.page += 1
+
+    def query_usernames(self, query, chunk_size=1000):
+        """Return the usernames on every page of a StudentQuery, in its order"""
+        return [row["username"] for row in self.query_rows(query, chunk_size)]
+
+    def save_user_data(self, user_data):
+        """Persist profile and flat progress data for every user"""
+        self._flush_queued()
+        self.backend.save_user_records(user_data, self.get_curriculum().key_index)
+        drop_index(self.store_key)
+
+    def get_rollups(self, usernames=None, records=None):
+        """Return precomputed {username: UserRollup}, rebuilding any that are missing.
+
+        Pass records when the {username: record} data is already loaded, so
+        the backend does not read each user's record again.
+        """
+        rollups = self.backend.get_rollups(usernames, records)
+        missing = [username for username, rollup in rollups.items() if rollup is None]
+        if missing:
+            key_index = self.get_curriculum().key_index
+            rebuilt = {}
+            for username in missing:
+                record = (records or {}).get(username) or self.backend.get_user_record(username) or {}
+                rebuilt[username] = UserRollup.from_progress(record.get("progress", {}), key_index)
+            self.backend.save_rollups(rebuilt)
+            rollups.update(rebuilt)
+        return rollups
+
+    def save_changes(self, user_data, changes):
+        """Persist only the fields and progress entries recorded by a ChangeTracker"""
+        if not changes.has_changes():
+            return False
+
+        for username, fields in changes.dirty_fields().items():
+            record = user_data.get(username, {})
+            values = {field: record.get(field) for field in fields}
+            if self.writer:
+                self.writer.submit_fields(username, values)
+            else:
+                self.backend.update_user_fields(username, values)
+
+        saved = True
+        for username, keys in list(changes.dirty_progress().items()):
+            if self.writer:
+                # Queued writes that lost to another process surface on the user's next save
+                lost = self.writer.conflicts(username)
+                if lost:
+                    changes.record_conflicts(username, lost)
+                    keys = changes.dirty_progress().get(username, set())
+            progress = user_data.get(username, {}).get("progress", {})
+            entries = {key: progress[key] for key in sorted(keys) if key in progress}
+            while True:
+                try:
+                    saved = self.save_progress_many(username, entries) and saved
+                    break
+                except ConcurrentUpdateError as e:
+                    # Another session wrote these first: keep its values and retry the rest
+                    stored = (self.backend.get_user_record(username) or {}).get("progress", {})
+                    for key in e.keys:
+                        entries.pop(key, None)
+                        if key in stored:
+                            progress[key] = stored[key]
+                        else:
+                            progress.pop(key, None)
+                    changes.record_conflicts(username, e.keys)
+                    log.warning("concurrent update, kept stored values", username=username, keys=sorted(e.keys))
+
+        if saved:
+            changes.clear()
+        return saved
+
+    def save_progress_many(self, username, entries):
+        """Save several {progress_key: entry} updates for one user in a single batched write"""
+        if not entries:
+            return True
+        try:
+            curriculum = self.get_curriculum()
+            items = [(key, curriculum.parts_for_key(key), entry) for key, entry in entries.items()]
+            if self.writer:
+                self.writer.submit_progress(username, items)
+            else:
+                self.backend.save_progress_entries(username, items)
+            self._index_deadlines(username, entries)
+            return True
+        except ConcurrentUpdateError:
+            raise
+        except Exception:
+            log.exception("saving progress failed", username=username, entries=len(entries))
+            return False
+
+    def import_records(self, accounts, profiles, progress):
+        """Write bulk-imported users, profile fields and {username: {key: entry}} progress in one batch.
+
+        Raises FlushTimeoutError if queued edits cannot be stored first.
+        """
+        # Queued edits land first so the import is applied on top of them
+        self._flush_queued()
+        try:
+            curriculum = self.get_curriculum()
+            self.backend.import_records(accounts, profiles, {
+                username: [(key, curriculum.parts_for_key(key), entry) for key, entry in entries.items()]
+                for username, entries in progress.items()
+            })
+            for username, entries in progress.items():
+                self._index_deadlines(username, entries)
+            return True
+        except Exception:
+            log.exception("importing records failed", users=len(accounts), progress_users=len(progress))
+            return False
 
     def _load_json(self, file_path):
         """Load JSON file safely"""
-        try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    content = f.read().strip()
-                    return json.loads(content) if content else {}
-            return {}
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error loading {file_path}: {e}")
-            return {}
+        return load_json(file_path)
 
     def _save_json(self, file_path, data):
         """Save JSON data safely using atomic write"""
-        temp_file = f"{file_path}.tmp"
-        try:
-            with open(temp_file, 'w') as f:
-                json.dump(data, f, indent=4)
-            os.replace(temp_file, file_path)
-            print(f"Successfully saved {file_path}")  # Debug logging
-        except Exception as e:
-            print(f"Error saving {file_path}: {e}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            raise
+        save_json(file_path, data)
+        log.debug("file saved", path=file_path)
 
     def update_career_path(self, username, career_path):
         """Update user's career path"""
-        user_data = self._load_json(self.user_data_file)
-        if username not in user_data:
-            user_data[username] = {"progress": {}}
-        user_data[username]["career_path"] = career_path
-        self._save_json(self.user_data_file, user_data)
\ No newline at end of file
+        if self.writer:
+            self.writer.submit_fields(username, {"career_path": career_path})
+        else:
+            self.backend.update_user_fields(username, {"career_path": career_path})
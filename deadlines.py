@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def parse_deadline(value):
+    """Return the date for a stored "YYYY-MM-DD" deadline, or None if it is not one"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def latest_deadline(entry):
+    """Return the most recently set deadline of a progress entry as a date, or None"""
+    deadlines = entry.get("deadlines") or []
+    return parse_deadline(deadlines[-1]) if deadlines else None
+
+
+class DeadlineIndex:
+    """Each student's latest deadline per subtopic, sorted by date and joined with completion.
+
+    Unfinished entries are kept in a list of (deadline, username, key)
+    tuples in date order, so overdue and due-soon queries bisect to the
+    date range and only touch the rows they return. Writes update single
+    entries in place instead of rebuilding the index.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._open = []
+        self._lock = threading.RLock()
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._open)
+
+    def _remove(self, username, key):
+        old = self._entries.pop((username, key), None)
+        if old is not None and old[1] < 100:
+            row = (old[0], username, key)
+            i = bisect.bisect_left(self._open, row)
+            if i < len(self._open) and self._open[i] == row:
+                del self._open[i]
+
+    def update(self, username, entries):
+        """Index {progress_key: entry} updates for one user; entries without a deadline are dropped"""
+        with self._lock:
+            for key, entry in entries.items():
+                self._remove(username, key)
+                deadline = latest_deadline(entry)
+                if deadline is None:
+                    continue
+                completion = entry.get("completion", 0)
+                self._entries[(username, key)] = (deadline, completion)
+                if completion < 100:
+                    bisect.insort(self._open, (deadline, username, key))
+
+    @classmethod
+    def build(cls, chunks):
+        """Build an index from {username: record} chunks such as DataManager.iter_user_records"""
+        index = cls()
+        for records in chunks:
+            for username, record in records.items():
+                progress = record.get("progress", {})
+                for key, entry in progress.items():
+                    deadline = latest_deadline(entry)
+                    if deadline is None:
+                        continue
+                    completion = entry.get("completion", 0)
+                    index._entries[(username, key)] = (deadline, completion)
+                    if completion < 100:
+                        index._open.append((deadline, username, key))
+        # One sort for the whole cohort instead of an insort per entry
+        index._open.sort()
+        index.built_at = time.monotonic()
+        return index
+
+    def _range(self, start, end):
+        """Return the (lo, hi) slice of unfinished entries due from start through end"""
+        lo = 0 if start is None else bisect.bisect_left(self._open, (start,))
+        hi = bisect.bisect_left(self._open, (end + timedelta(days=1),))
+        return lo, hi
+
+    def due_between(self, start, end, limit=None):
+        """Return (deadline, username, key, completion) for unfinished entries due from start through end"""
+        with self._lock:
+            lo, hi = self._range(start, end)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return [(deadline, username, key, self._entries[(username, key)][1])
+                    for deadline, username, key in self._open[lo:hi]]
+
+    def count_between(self, start, end):
+        """Return how many unfinished entries are due from start through end"""
+        with self._lock:
+            lo, hi = self._range(start, end)
+            return hi - lo
+
+    def overdue(self, today=None, limit=None):
+        """Return unfinished entries whose deadline is before today, oldest first"""
+        today = today or date.today()
+        return self.due_between(None, today - timedelta(days=1), limit)
+
+    def due_within(self, days, today=None, limit=None):
+        """Return unfinished entries due from today through today + days, soonest first"""
+        today = today or date.today()
+        return self.due_between(today, today + timedelta(days=days), limit)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+# Per-key build locks, and updates saved while a build is reading the store
+_build_locks = {}
+_pending = {}
+_generations = {}
+
+
+def _fresh(index, max_age):
+    return index is not None and time.monotonic() - index.built_at <= max_age
+
+
+def shared_index(key, build, max_age=300):
+    """Return the process-wide index for key, building it when missing or older than max_age seconds.
+
+    Writes in this process keep the shared index current; the periodic
+    rebuild picks up writes made by other processes. The build runs
+    outside the process-wide lock, so saves never wait for it: updates
+    made while it reads the store are queued and replayed onto the new
+    index before it is swapped in.
+    """
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if _fresh(index, max_age):
+            return index
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if _fresh(index, max_age):
+                return index
+            _pending[key] = []
+            generation = _generations.get(key, 0)
+        try:
+            index = build()
+        except BaseException:
+            with _indexes_lock:
+                _pending.pop(key, None)
+            raise
+        # Replay and publish in the same critical section that stops the
+        # queueing, so a save landing in between cannot miss both indexes
+        with _indexes_lock:
+            for username, entries in _pending.pop(key):
+                index.update(username, entries)
+            # A drop_index during the build means the store was replaced under it
+            if _generations.get(key, 0) == generation:
+                _indexes[key] = index
+        return index
+
+
+def update_shared(key, username, entries):
+    """Apply saved {progress_key: entry} values to the shared index for key and to any build in progress"""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if key in _pending:
+            _pending[key].append((username, entries))
+    if index is not None:
+        index.update(username, entries)
+
+
+def drop_index(key):
+    """Forget the shared index for key so the next query rebuilds it"""
+    with _indexes_lock:
+        _indexes.pop(key, None)
+        _generations[key] = _generations.get(key, 0) + 1
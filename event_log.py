@@ -0,0 +1,315 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+
+from app_logging import get_logger
+from locking import FileLock
+from rollups import UserRollup
+from storage import JSONBackend, StorageBackend, check_versions, load_json, shared_file_cache
+
+log = get_logger("event_log")
+
+
+def encode_event(username, key, parts, entry):
+    """Return one compact JSON line recording a progress entry write"""
+    return json.dumps({"user": username, "key": key, "parts": list(parts), "entry": entry},
+                      separators=(",", ":")) + "\n"
+
+
+def _parse_events(file_path, data):
+    """Return (events, bytes consumed) for the complete lines in data.
+
+    A torn last line from an interrupted append is left for the next read,
+    and generation headers written by ProgressEventLog.rotate are skipped.
+    """
+    end = data.rfind(b"\n") + 1
+    events = []
+    for line in data[:end].splitlines():
+        if line.strip():
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError as e:
+                log.warning("skipping bad event", path=file_path, error=str(e))
+                continue
+            if "user" in event:
+                events.append(event)
+    return events, end
+
+
+def read_events(file_path):
+    """Return every event recorded in a log or history file"""
+    try:
+        with open(file_path, "rb") as f:
+            return _parse_events(file_path, f.read())[0]
+    except FileNotFoundError:
+        return []
+
+
+class ProgressEventLog:
+    """Append-only JSON-lines log of progress entry writes.
+
+    The unfolded tail is cached per process, as EventLogBackend shares one
+    instance per log path, and read incrementally; the returned tail is
+    shared, so iterate it while holding `lock`. A compaction swaps in a
+    fresh file starting with a new generation header, which tells readers
+    to drop their cached tail.
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.lock = FileLock(log_file)
+        self._header = None
+        self._offset = 0
+        self._tail = {}
+
+    def append(self, username, items):
+        """Append one event per (key, parts, entry) item"""
+        with self.lock:
+            with open(self.log_file, "a") as f:
+                f.write("".join(encode_event(username, key, parts, entry) for key, parts, entry in items))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def tail(self):
+        """Return {username: [(key, parts, entry)]} for events not yet compacted, in write order"""
+        with self.lock:
+            try:
+                with open(self.log_file, "rb") as f:
+                    header = f.readline()
+                    if header != self._header:
+                        self._header, self._offset, self._tail = header, 0, {}
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                self._header, self._offset, self._tail = None, 0, {}
+                return self._tail
+            events, consumed = _parse_events(self.log_file, data)
+            self._offset += consumed
+            for event in events:
+                self._tail.setdefault(event["user"], []).append(
+                    (event["key"], tuple(event["parts"]), event["entry"])
+                )
+            return self._tail
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(items) for items in self.tail().values())
+
+    def rotate(self, history_file):
+        """Move the folded events to history_file and start an empty log"""
+        with self.lock:
+            if os.path.exists(self.log_file):
+                with open(self.log_file, "rb") as src, open(history_file, "ab") as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            directory, name = os.path.split(os.path.abspath(self.log_file))
+            fd, temp_file = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps({"generation": uuid.uuid4().hex}) + "\n")
+            os.replace(temp_file, self.log_file)
+            self._header, self._offset, self._tail = None, 0, {}
+
+
+class Compactor(threading.Thread):
+    """Daemon thread folding an EventLogBackend's log into its snapshot.
+
+    It runs every `interval` seconds, or sooner when request() is called
+    after the log has grown past the backend's threshold.
+    """
+
+    def __init__(self, backend, interval=30):
+        super().__init__(name=f"compactor:{backend.log.log_file}", daemon=True)
+        self.backend = backend
+        self.interval = interval
+        self._wake = threading.Event()
+
+    def request(self):
+        """Ask for a compaction without waiting for the next interval"""
+        self._wake.set()
+
+    def run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.backend.compact()
+            except Exception:
+                log.exception("compaction failed", path=self.backend.log.log_file)
+
+
+_compactors = {}
+_compactors_lock = threading.Lock()
+
+
+class EventLogBackend(JSONBackend):
+    """JSON storage whose progress writes are appended to an event log.
+
+    user_data.json becomes a snapshot: a progress update appends one line
+    instead of rewriting it, reads overlay the log tail on the snapshot, and a background Compactor folds the tail into the
+    snapshot and archives the folded events in a history file.
+    """
+
+    def __init__(self, users_file="users.json", progress_file="progress.json",
+                 user_data_file="user_data.json", log_file="progress_events.jsonl",
+                 history_file="progress_history.jsonl", compact_every=500, compact_interval=30):
+        super().__init__(users_file, progress_file, user_data_file)
+        # Shared per log path, so reruns keep reading the cached tail incrementally from its offset
+        self.log = shared_file_cache(ProgressEventLog, log_file)
+        self.history_file = history_file
+        self.compact_every = compact_every
+
+        # One compactor per log file, however often the backend is recreated
+        key = os.path.abspath(log_file)
+        with _compactors_lock:
+            alive = key in _compactors and _compactors[key].is_alive()
+            if not alive and compact_interval:
+                _compactors[key] = Compactor(self, compact_interval)
+                _compactors[key].start()
+            self._compactor = _compactors.get(key)
+
+    def save_progress_entries(self, username, items):
+        with self.log.lock:
+            tail = self.log.tail()
+            stored = {key: entry.get("version", 0)
+                      for key, entry in (self._read_record(username) or {}).get("progress", {}).items()}
+            stored.update((key, entry.get("version", 0)) for key, _, entry in tail.get(username, []))
+            versions = check_versions(username, items, stored)
+            self.log.append(username, [(key, parts, {**entry, "version": versions[key]})
+                                       for key, parts, entry in items])
+            pending = len(self.log)
+
+        # Callers keep editing their copies, so hand them the stored versions
+        for key, _, entry in items:
+            entry["version"] = versions[key]
+
+        if pending >= self.compact_every:
+            if self._compactor is not None:
+                self._compactor.request()
+            else:
+                self.compact()
+
+    def save_progress_batches(self, batches):
+        # Appends are cheap already; hold the log lock once for the whole batch
+        with self.log.lock:
+            return StorageBackend.save_progress_batches(self, batches)
+
+    def compact(self):
+        """Fold the log into the snapshot files; return the number of events folded"""
+        with self.log.lock, self._user_data_lock:
+            tail = self.log.tail()
+            if not tail:
+                return 0
+            count = sum(len(items) for items in tail.values())
+            self._store_progress(load_json(self.user_data_file), tail)
+            self.log.rotate(self.history_file)
+            return count
+
+    def _overlay(self, user_data, usernames=None):
+        """Apply unfolded log entries to a mutable copy of user_data"""
+        for username, items in self.log.tail().items():
+            if usernames is not None and username not in usernames:
+                continue
+            record = user_data.setdefault(username, {"career_path": items[0][1][0] or None, "progress": {}})
+            progress = record.setdefault("progress", {})
+            for key, _, entry in items:
+                progress[key] = copy.deepcopy(entry)
+        return user_data
+
+    def get_user_record(self, username):
+        with self.log.lock:
+            record = self._read_record(username)
+            user_data = {username: record} if record is not None else {}
+            return self._overlay(user_data, {username}).get(username)
+
+    def get_all_user_records(self):
+        with self.log.lock:
+            return self._overlay(load_json(self.user_data_file))
+
+    def iter_user_records(self, usernames=None, chunk_size=500):
+        # Snapshot chunks are read by span as in JSONBackend, with the log tail applied per chunk
+        if usernames is None:
+            with self.log.lock:
+                logged = list(self.log.tail())
+            usernames = list(dict.fromkeys([*self._record_names(), *logged]))
+        else:
+            usernames = list(usernames)
+        for start in range(0, len(usernames), chunk_size):
+            chunk = usernames[start:start + chunk_size]
+            with self.log.lock:
+                records = self._overlay(self._read_records(chunk), set(chunk))
+            yield records
+
+    def get_rollups(self, usernames=None, records=None):
+        # Loaded records already include the log tail, which is replayed against snapshot values
+        # below, so they are not used; the cached snapshot serves any many-user lookup instead
+        with self.log.lock:
+            tail = self.log.tail()
+            if usernames is None:
+                snapshot = self._snapshot.load()
+                usernames, read_record = list(dict.fromkeys([*snapshot, *tail])), snapshot.get
+            elif records is not None:
+                read_record = self._snapshot.load().get
+            else:
+                read_record = self._read_record
+            rollups = {}
+            for username in usernames:
+                record = read_record(username) or {}
+                progress = record.get("progress", {})
+                if "rollups" in record or not progress:
+                    rollup = UserRollup.from_json(record.get("rollups", {}))
+                else:
+                    rollups[username] = None
+                    continue
+                # Replay the tail against the snapshot values it replaces
+                current = {}
+                for key, parts, entry in tail.get(username, []):
+                    old = current.get(key, progress.get(key))
+                    rollup.apply(parts[0], parts[1], parts[2],
+                                 old.get("completion", 0) if old is not None else None,
+                                 entry.get("completion", 0))
+                    current[key] = entry
+                rollups[username] = rollup
+            return rollups
+
+    def save_user_records(self, user_data, key_index):
+        # Whole-record writes replace the snapshot, so fold the log first
+        with self.log.lock:
+            self.compact()
+            super().save_user_records(user_data, key_index)
+
+    def import_records(self, accounts, profiles, progress):
+        with self.log.lock:
+            self.compact()
+            super().import_records(accounts, profiles, progress)
+
+    def save_rollups(self, rollups):
+        with self.log.lock:
+            self.compact()
+            super().save_rollups(rollups)
+
+    def read_history(self):
+        """Yield every recorded event, archived ones first"""
+        for file_path in (self.history_file, self.log.log_file):
+            yield from read_events(file_path)
+
+
+def progress_velocity(events, since):
+    """Return {username: completion points gained per day} from events timestamped at or after since"""
+    last = {}
+    gained = {}
+    for event in events:
+        entry = event["entry"]
+        key = (event["user"], event["key"])
+        completion = entry.get("completion", 0)
+        previous = last.get(key, 0)
+        last[key] = completion
+        timestamp = entry.get("timestamp")
+        if timestamp and datetime.fromisoformat(timestamp) >= since:
+            gained[event["user"]] = gained.get(event["user"], 0) + completion - previous
+    days = max((datetime.now() - since).total_seconds() / 86400, 1e-9)
+    return {username: points / days for username, points in gained.items()}
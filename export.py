@@ -0,0 +1,180 @@
+import argparse
+import csv
+import gzip
+import io
+import os
+import sys
+import tempfile
+import time
+
+from aggregation import build_progress_matrix, phase_progress_table
+from storage import progress_key
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+PHASE_COLUMNS = ["Student", "Career Path", "Phase", "Progress"]
+SUBTOPIC_COLUMNS = ["Student", "Career Path", "Phase", "Topic", "Subtopic", "Completion", "Deadline", "Last Updated"]
+
+
+def _student_chunks(manager, students=None, career_path=None, chunk_size=500):
+    """Yield {username: record} chunks of students with a (matching) career path"""
+    for records in manager.iter_user_records(students, chunk_size):
+        chunk = {
+            username: record for username, record in records.items()
+            if record.get("career_path") is not None
+            and (career_path is None or record.get("career_path") == career_path)
+        }
+        if chunk:
+            yield chunk
+
+
+def iter_phase_rows(manager, students=None, career_path=None, chunk_size=500):
+    """Yield lists of Student, Career Path, Phase, Progress rows, one list per chunk of students"""
+    curriculum = manager.get_curriculum()
+    for records in _student_chunks(manager, students, career_path, chunk_size):
+        table = phase_progress_table(build_progress_matrix(records, curriculum, list(records)))
+        yield list(table.itertuples(index=False, name=None))
+
+
+def iter_subtopic_rows(manager, students=None, career_path=None, chunk_size=500):
+    """Yield lists of per-subtopic rows covering every subtopic of each student's track.
+
+    Completion is left empty for subtopics the student has not started.
+    """
+    curriculum = manager.get_curriculum()
+    for records in _student_chunks(manager, students, career_path, chunk_size):
+        rows = []
+        for username, record in records.items():
+            track = record["career_path"]
+            progress = record.get("progress", {})
+            for subtopic_id in curriculum.track_range(track):
+                _, phase, topic, subtopic = curriculum.parts_for_id(subtopic_id)
+                entry = progress.get(curriculum.key_for_id(subtopic_id))
+                if entry is None:
+                    # Older entries may only exist under the phase-less key
+                    entry = progress.get(progress_key(track, None, topic, subtopic))
+                entry = entry or {}
+                deadlines = entry.get("deadlines") or []
+                rows.append((username, track, phase, topic, subtopic, entry.get("completion"),
+                             deadlines[-1] if deadlines else None, entry.get("timestamp")))
+        yield rows
+
+
+def _write_csv(chunks, columns, text_stream):
+    writer = csv.writer(text_stream)
+    writer.writerow(columns)
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def _write_parquet(chunks, columns, stream):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    numeric = {"Progress": pa.float64(), "Completion": pa.int64()}
+    schema = pa.schema([(column, numeric.get(column, pa.string())) for column in columns])
+    count = 0
+    with pq.ParquetWriter(stream, schema) as writer:
+        for rows in chunks:
+            if rows:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                count += len(rows)
+    return count
+
+
+def export_report(manager, stream, fmt="csv", detail="phase", students=None, career_path=None, chunk_size=500):
+    """Stream the Student Comparison report into a binary stream; return the number of rows.
+
+    detail is "phase" (per-phase averages, as shown in the app) or
+    "subtopic" (one row per subtopic). Students are read chunk_size at a
+    time, so memory stays bounded by the chunk rather than the cohort.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if detail == "phase":
+        columns, chunks = PHASE_COLUMNS, iter_phase_rows(manager, students, career_path, chunk_size)
+    elif detail == "subtopic":
+        columns, chunks = SUBTOPIC_COLUMNS, iter_subtopic_rows(manager, students, career_path, chunk_size)
+    else:
+        raise ValueError(f"Unknown export detail: {detail}")
+
+    if fmt == "parquet":
+        return _write_parquet(chunks, columns, stream)
+
+    target = gzip.GzipFile(fileobj=stream, mode="wb") if fmt == "csv.gz" else stream
+    text_stream = io.TextIOWrapper(target, encoding="utf-8", newline="")
+    try:
+        return _write_csv(chunks, columns, text_stream)
+    finally:
+        text_stream.flush()
+        text_stream.detach()
+        if target is not stream:
+            target.close()
+
+
+EXPORT_PREFIX = "tracker_export_"
+
+
+def remove_stale_exports(max_age=3600):
+    """Delete export files older than max_age seconds, such as those left by abandoned sessions"""
+    directory = tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        if not name.startswith(EXPORT_PREFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def export_to_file(manager, fmt="csv", detail="phase", students=None, career_path=None, chunk_size=500):
+    """Run export_report into a new temporary file and return its path.
+
+    The caller removes the file once it is served; files it never removes
+    are swept by remove_stale_exports on a later export.
+    """
+    remove_stale_exports()
+    with tempfile.NamedTemporaryFile(prefix=EXPORT_PREFIX, suffix=f".{FORMATS[fmt][1]}", delete=False) as f:
+        try:
+            export_report(manager, f, fmt, detail, students, career_path, chunk_size)
+        except Exception:
+            f.close()
+            os.remove(f.name)
+            raise
+        return f.name
+
+
+if __name__ == "__main__":
+    from data_manager import DataManager
+
+    parser = argparse.ArgumentParser(description="Export the Student Comparison report")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--detail", choices=["phase", "subtopic"], default="phase")
+    parser.add_argument("--career-path", help="Only export students on this career path")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Students read per chunk")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout")
+    args = parser.parse_args()
+
+    manager = DataManager()
+    if args.output == "-":
+        rows = export_report(manager, sys.stdout.buffer, args.format, args.detail,
+                             career_path=args.career_path, chunk_size=args.chunk_size)
+    else:
+        with open(args.output, "wb") as f:
+            rows = export_report(manager, f, args.format, args.detail,
+                                 career_path=args.career_path, chunk_size=args.chunk_size)
+    print(f"Exported {rows} rows", file=sys.stderr)
@@ -0,0 +1,97 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from perf import measure
+
+
+def _feed(digest, value):
+    """Feed a stable byte representation of value into digest"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key, item in value.items():
+            _feed(digest, key)
+            _feed(digest, item)
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _feed(digest, item)
+        digest.update(b"]")
+    elif hasattr(value, "fingerprint_parts"):
+        _feed(digest, value.fingerprint_parts())
+    else:
+        digest.update(repr(value).encode())
+        digest.update(b"|")
+
+
+def fingerprint(*values):
+    """Return a short hash of the numbers and labels a figure is built from"""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        _feed(digest, value)
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Thread-safe LRU cache of Plotly figures keyed by data fingerprint.
+
+    Figures are shared between reruns and sessions, so callers must treat a
+    returned figure as read-only.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for key, building and storing it on a miss"""
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        """Drop every cached figure"""
+        with self._lock:
+            self._figures.clear()
+
+    def __len__(self):
+        return len(self._figures)
+
+
+figure_cache = FigureCache()
+
+
+def memoize_figure(build):
+    """Decorator that reuses a figure while the builder's arguments are unchanged"""
+    @functools.wraps(build)
+    def wrapper(*args):
+        with measure(f"chart.{build.__name__}"):
+            key = (build.__name__, fingerprint(*args))
+            return figure_cache.get_or_build(key, lambda: build(*args))
+    return wrapper
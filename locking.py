@@ -0,0 +1,72 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_path_states = {}
+_path_states_guard = threading.Lock()
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when a versioned write finds the record was changed by another writer"""
+
+    def __init__(self, username, keys):
+        super().__init__(f"Progress for {username} was updated concurrently: {', '.join(keys)}")
+        self.username = username
+        self.keys = keys
+
+
+class FileLock:
+    """Exclusive lock guarding read-modify-write cycles on one data file.
+
+    Combines a per-path thread lock (sessions inside one Streamlit server)
+    with an OS advisory lock on `<file>.lock` (several server processes).
+    Re-entrant within a thread, so nested helpers can take the same lock.
+    """
+
+    def __init__(self, file_path):
+        self.lock_path = f"{os.path.abspath(file_path)}.lock"
+        # Every FileLock on the same path shares one state, so nesting two
+        # instances never flocks the file twice from the same thread
+        with _path_states_guard:
+            if self.lock_path not in _path_states:
+                _path_states[self.lock_path] = (threading.RLock(), threading.local())
+            self._thread_lock, self._local = _path_states[self.lock_path]
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            try:
+                handle = open(self.lock_path, "a+")
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            except Exception:
+                self._thread_lock.release()
+                raise
+            self._local.handle = handle
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            handle = self._local.handle
+            try:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                handle.close()
+                self._local.handle = None
+        self._thread_lock.release()
+        return False
@@ -1,40 +1,37 @@
 import streamlit as st
+import csv
+import io
 import json
 import os
-import datetime
+import uuid
+from datetime import date, timedelta
+import pandas as pd
 import data_manager  
 import auth  
-import plotly.express as px
-import pandas as pd
-from visualization import create_progress_chart, create_average_progress_chart
-
-# File for storing user data
-USER_DATA_FILE = "user_data.json"
+from change_tracker import ChangeTracker
+from visualization import (create_career_average_chart, create_career_distribution_chart, create_comparison_chart,
+                           create_progress_histogram)
+from student_view import render_lazy_dashboard, render_overall_summary, render_tabbed_dashboard
+from aggregation import build_rollup_matrix, class_summary, phase_progress_table, career_averages
+from export import FORMATS, export_to_file
+from bulk_import import bulk_import
+from student_query import StudentQuery
+import perf
+import reminders
+from deadlines import DeadlineIndex
+from write_behind import FlushTimeoutError
+
+# Time this rerun for the admin profiling panel, per session and page
+if "perf_session" not in st.session_state:
+    st.session_state["perf_session"] = uuid.uuid4().hex[:8]
+perf.start_rerun(st.session_state["perf_session"],
+                 st.session_state.get("role") or st.session_state.get("current_page") or "login")
 
 # Initialize Data
 manager = data_manager.DataManager()
 auth_instance = auth.Auth(manager)
-
-# Function to Load Data from JSON
-def load_json_data(file_path):
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, "r") as f:
-                data = f.read().strip()
-                return json.loads(data) if data else {}  # Empty JSON if file is empty
-        except json.JSONDecodeError:
-            return {}  # Return empty dictionary if JSON is corrupt
-    return {}
-
-# Function to Save Data to JSON
-def save_json_data(data, file_path):
-    temp_file = file_path + ".tmp"
-    with open(temp_file, "w") as f:
-        json.dump(data, f, indent=4)
-    os.replace(temp_file, file_path)  # Safely replace original file
-
-# Load saved user data
-user_data = load_json_data(USER_DATA_FILE)
+# Deadline reminders run on their own thread when REMINDER_TRANSPORT is set
+reminder_scheduler = reminders.start_scheduler()
 
 # Session State Initialization
 if "logged_in" not in st.session_state:
@@ -113,12 +110,16 @@ if not st.session_state["logged_in"]:
                         st.error("Registration failed - please try again")
                         st.session_state["register_status"] = "error"
 else:
-    # Load user data
-    user_data = load_json_data(USER_DATA_FILE)
     current_username = st.session_state['username']
+    # Sessions load only their own record; an admin also loads the one student they view,
+    # while the overview tabs work from query rows and stored rollups
+    user_data = {current_username: manager.get_user_record(current_username)}
+
+    # Collect this run's edits so only changed entries are written back
+    changes = ChangeTracker()
 
     # Initialize user's data if not exists
-    if current_username not in user_data:
+    if user_data.get(current_username) is None:
         user_data[current_username] = {"career_path": None, "progress": {}}
 
     with st.sidebar:
@@ -127,15 +128,27 @@ else:
 
         # Admin: Student Selection
         if st.session_state["role"] == "admin":
-            all_users = [user for user in user_data.keys() if user_data[user].get("career_path") is not None]
-            if all_users:
+            # Only the first page of matching names is listed; typing narrows it down
+            name_prefix = st.text_input("Find Student", key="student_search", placeholder="Name starts with...")
+            student_page = manager.query_students(StudentQuery(name_prefix=name_prefix, page_size=50))
+            if student_page.total:
                 selected_student = st.selectbox("View Student Progress", 
-                                              ["All Students"] + all_users,
+                                              ["All Students"] + student_page.usernames,
                                               index=0)
+                if student_page.total > len(student_page.rows):
+                    st.caption(f"Showing {len(student_page.rows)} of {student_page.total} students")
                 st.session_state["selected_student"] = selected_student
+            elif name_prefix:
+                st.info("No students match that name.")
+                st.session_state["selected_student"] = "All Students"
             else:
                 st.info("No student data available yet.")
 
+        st.toggle("⚡ Lazy navigation", value=True, key="lazy_navigation",
+                  help="Render only the selected phase and topic instead of every tab")
+        st.toggle("📝 Batch edit", value=False, key="batch_edit",
+                  help="Edit a topic's sliders and deadlines in one form and save them together")
+
         if st.button("Logout", use_container_width=True):
             auth_instance.logout()
             st.rerun()
@@ -147,6 +160,8 @@ else:
     if st.session_state["role"] == "admin" and st.session_state.get("selected_student") not in [None, "All Students"]:
         viewing_user = st.session_state["selected_student"]
         is_viewing_other = True
+        if viewing_user not in user_data:
+            user_data[viewing_user] = manager.get_user_record(viewing_user) or {"career_path": None, "progress": {}}
         st.info(f"You are viewing {viewing_user}'s progress as admin")
 
     # Career Path Selection - Fixed once chosen
@@ -164,9 +179,9 @@ else:
         ], index=None, placeholder="Select Course Type")
 
         if selected_track and course_type and st.button("Confirm Career Path Selection", type="primary"):
-            user_data[current_username]["career_path"] = selected_track
-            user_data[current_username]["course_type"] = course_type  # Store the course type
-            save_json_data(user_data, USER_DATA_FILE)
+            changes.set_field(user_data, current_username, "career_path", selected_track)
+            changes.set_field(user_data, current_username, "course_type", course_type)  # Store the course type
+            manager.save_changes(user_data, changes)
             st.success(f"You have selected {selected_track} ({course_type}) as your career path")
             st.rerun()
     else:
@@ -192,7 +207,7 @@ else:
         st.markdown(f"## 🎓 {current_track} Career Path - {course_type}")
 
         # Get topics for the selected track
-        topics_data = manager.get_topics(current_track)
+        curriculum = manager.get_curriculum()
 
         # Profile Summary Section
         with st.expander("📋 Profile Summary", expanded=True):
@@ -206,471 +221,268 @@ else:
                 disabled=is_viewing_other
             )
             if new_summary != current_summary and not is_viewing_other:
-                user_data[viewing_user]["profile_summary"] = new_summary
-                save_json_data(user_data, USER_DATA_FILE)
-
-        # Create tabs for each phase
-        phase_tabs = st.tabs(list(topics_data.keys()))
-
-        # Track overall progress data for final summary
-        overall_progress = {}
-
-        # Process each phase in its own tab
-        for tab_idx, phase_name in enumerate(topics_data.keys()):
-            with phase_tabs[tab_idx]:
-                st.markdown(f"### Phase: {phase_name}")
-
-                # Initialize phase progress tracking
-                phase_progress = {}
-                topics = topics_data[phase_name]
-
-                # Create a subtab for each topic in this phase
-                topic_tabs = st.tabs(list(topics.keys()))
-
-                for topic_idx, topic_name in enumerate(topics.keys()):
-                    with topic_tabs[topic_idx]:
-                        subtopics = topics[topic_name]
-                        topic_progress = {}
-
-                        if isinstance(subtopics, list):
-                            for subtopic in subtopics:
-                                # Create unique key for this subtopic
-                                subtopic_key = f"{current_track}_{phase_name}_{topic_name}_{subtopic}"
-
-                                # Get existing data for this subtopic
-                                if "progress" not in user_data[viewing_user]:
-                                    user_data[viewing_user]["progress"] = {}
-
-                                subtopic_data = user_data[viewing_user]["progress"].get(subtopic_key, {"completion": 0, "deadlines": []})
-
-                                # Initialize columns
-                                col1, col2, col3 = st.columns([3, 1, 2])
-
-                                with col1:
-                                    label = f"{subtopic}"
-                                    st.markdown(f"**{label}**")
-                                    # Add document link input if in Documents section
-                                    if "Portfolio" in topic_name:
-                                        # Create columns for link input/display and edit button
-                                        link_col1, link_col2 = st.columns([4, 1])
-
-                                        # Initialize progress data if not exists
-                                        if subtopic_key not in user_data[viewing_user]["progress"]:
-                                            user_data[viewing_user]["progress"][subtopic_key] = {
-                                                "completion": 0,
-                                                "deadlines": [],
-                                                "link": "",
-                                                "editing": False
-                                            }
-
-                                        # Get current link and editing state
-                                        progress_data = user_data[viewing_user]["progress"][subtopic_key]
-                                        current_link = progress_data.get("link", "")
-                                        
-
-                                        # Initialize editing state if not exists
-                                        if "editing" not in progress_data:
-                                            progress_data["editing"] = False
-
-                                        if current_link and not progress_data["editing"]:
-                                            # Display current link as clickable
-                                            st.markdown(f"[{subtopic}]({current_link})")
-                                        else:
-                                            # Initialize session state for this link
-                                            link_key = f"link_{viewing_user}_{subtopic_key}"
-                                            if link_key not in st.session_state:
-                                                st.session_state[link_key] = current_link or ""
-
-                                            # Show input field when editing
-                                            new_link = st.text_input(
-                                                "Document Link",
-                                                value=st.session_state[link_key],
-                                                key=link_key,
-                                                placeholder="Enter document URL",
-                                                disabled=is_viewing_other
-                                            )
-
-                                            # Save button to confirm changes
-                                            if st.button("Save Link", key=f"save_{subtopic_key}", disabled=is_viewing_other):
-                                                progress_data.update({
-                                                    "link": new_link,
-                                                    "editing": False
-                                                })
-                                                save_json_data(user_data, USER_DATA_FILE)
-                                                st.rerun()
-
-                                        with link_col2:
-                                            if not is_viewing_other:
-                                                if current_link and not progress_data["editing"]:
-                                                    if st.button("📝 Edit", key=f"edit_{subtopic_key}"):
-                                                        progress_data["editing"] = True
-                                                        save_json_data(user_data, USER_DATA_FILE)
-                                                        st.rerun()
-
-                                with col2:
-                                    percentage = st.slider("", 0, 100, subtopic_data.get("completion", 0), 
-                                                         key=f"{viewing_user}_{subtopic_key}",
-                                                         disabled=is_viewing_other)
-                                    topic_progress[subtopic] = percentage
-
-                                # Deadline Handling
-                                with col3:
-                                    prev_dates = subtopic_data.get("deadlines", [])
-
-                                    # Date input (disabled for admin viewing other users)
-                                    latest_date = None
-                                    if prev_dates:
-                                        try:
-                                            latest_date = datetime.datetime.strptime(prev_dates[-1], "%Y-%m-%d").date()
-                                        except (ValueError, IndexError):
-                                            latest_date = None
-
-                                    current_date = st.date_input("Deadline", 
-                                                              value=latest_date, 
-                                                              key=f"date_{viewing_user}_{subtopic_key}",
-                                                              disabled=is_viewing_other)
-
-                                    # Update dates if we have a new one and user has permission
-                                    if current_date and not is_viewing_other:
-                                        current_date_str = str(current_date)
-                                        # Only add the date if it's different from the last one
-                                        if not prev_dates or prev_dates[-1] != current_date_str:
-                                            prev_dates.append(current_date_str)
-                                            # Don't sort dates - we want to preserve the history in order of entry
-
-                                        # Update progress data
-                                        if "progress" not in user_data[viewing_user]:
-                                            user_data[viewing_user]["progress"] = {}
-
-                                        user_data[viewing_user]["progress"][subtopic_key] = {
-                                            "completion": percentage,
-                                            "deadlines": prev_dates,
-                                            "timestamp": datetime.datetime.now().isoformat()
-                                        }
-
-                                    # Format and display deadline history
-                                    if prev_dates:
-                                        st.markdown("##### Deadline History:")
-                                        timeline_html = ""
-
-                                        for i, date in enumerate(prev_dates):
-                                            # Format: older dates small and strikethrough, latest date bold
-                                            if i < len(prev_dates) - 1:
-                                                # Older dates (small and strikethrough)
-                                                size = max(70 - (len(prev_dates) - i - 1) * 5, 50)  # Size decreases with age
-                                                timeline_html += f"<span style='text-decoration:line-through;font-size:{size}%;color:gray;'>{date}</span> → "
-                                            else:
-                                                # Latest date (bold and larger)
-                                                timeline_html += f"<span style='font-weight:bold;font-size:110%;color:#1f77b4;'>{date}</span>"
-
-                                        st.markdown(timeline_html, unsafe_allow_html=True)
-
-                        # Topic progress visualization
-                        if topic_progress:
-                            st.markdown("#### Topic Progress")
-
-                            # Create DataFrame for better visualization
-                            topic_df = pd.DataFrame({
-                                'Subtopic': list(topic_progress.keys()),
-                                'Completion': list(topic_progress.values())
-                            })
-
-                            fig_topic = px.bar(
-                                topic_df,
-                                x='Subtopic',
-                                y='Completion',
-                                title=f"{topic_name} Progress",
-                                color='Completion',
-                                color_continuous_scale='Blues',
-                                labels={"Completion": "Completion (%)"}
-                            )
-                            fig_topic.update_layout(height=300)
-                            st.plotly_chart(fig_topic, use_container_width=True)
-
-                            # Add to phase progress
-                            phase_progress[topic_name] = sum(topic_progress.values()) / len(topic_progress)
-
-                # Phase progress visualization after all topics are processed
-                if phase_progress:
-                    st.markdown(f"### {phase_name} Phase Summary")
-
-                    # Create DataFrame for visualization
-                    phase_df = pd.DataFrame({
-                        'Topic': list(phase_progress.keys()),
-                        'Completion': list(phase_progress.values())
-                    })
-
-                    col1, col2 = st.columns(2)
-
-                    with col1:
-                        # Bar chart for detailed progress
-                        fig_phase_bar = px.bar(
-                            phase_df,
-                            x='Topic',
-                            y='Completion',
-                            title=f"{phase_name} Topics Completion",
-                            color='Completion',
-                            color_continuous_scale='Blues',
-                            text=[f"{v:.1f}%" for v in phase_df['Completion']]
-                        )
-                        fig_phase_bar.update_layout(height=350)
-                        st.plotly_chart(fig_phase_bar, use_container_width=True)
-
-                    with col2:
-                        # Pie chart for proportion
-                        fig_phase_pie = px.pie(
-                            phase_df,
-                            values='Completion',
-                            names='Topic',
-                            title=f"{phase_name} Topics Distribution"
-                        )
-                        fig_phase_pie.update_layout(height=350)
-                        st.plotly_chart(fig_phase_pie, use_container_width=True)
-
-                    # Store overall progress for this phase
-                    overall_progress[phase_name] = sum(phase_progress.values()) / len(phase_progress)
-
-        # Save all data
-        save_json_data(user_data, USER_DATA_FILE)
+                changes.set_field(user_data, viewing_user, "profile_summary", new_summary)
+                manager.save_changes(user_data, changes)
+
+        batch_edit = st.session_state.get("batch_edit", False)
+        if st.session_state.get("lazy_navigation", True):
+            # Only the selected phase and topic are rendered on this rerun
+            rollup = manager.get_rollups([viewing_user])[viewing_user]
+            overall_progress = render_lazy_dashboard(curriculum, current_track, user_data, viewing_user,
+                                                     is_viewing_other, changes, manager, rollup, batch_edit)
+        else:
+            overall_progress = render_tabbed_dashboard(curriculum, current_track, user_data, viewing_user,
+                                                       is_viewing_other, changes, manager, batch_edit)
+
+        # Save only the entries changed during this run
+        manager.save_changes(user_data, changes)
+        if changes.conflicts():
+            # Drop the stale widget values so the next run shows what was stored
+            for username, keys in changes.conflicts().items():
+                for key in keys:
+                    st.session_state.pop(f"{username}_{key}", None)
+                    st.session_state.pop(f"date_{username}_{key}", None)
+            st.warning("Some of your changes were updated in another session meanwhile and were not saved. "
+                       "Reload the page to see the latest values.")
 
         # Overall Progress Visualization (after all phases)
         st.markdown("## 📊 Overall Career Progress")
 
         if overall_progress:
-            # Create DataFrame for visualization
-            overall_df = pd.DataFrame({
-                'Phase': list(overall_progress.keys()),
-                'Completion': list(overall_progress.values())
-            })
-
-            col1, col2 = st.columns(2)
-
-            with col1:
-                # Bar chart for detailed progress
-                fig_overall_bar = px.bar(
-                    overall_df,
-                    x='Phase',
-                    y='Completion',
-                    title=f"{current_track} Overall Progress by Phase",
-                    color='Completion',
-                    color_continuous_scale='Blues',
-                    text=[f"{v:.1f}%" for v in overall_df['Completion']]
-                )
-                fig_overall_bar.update_layout(height=400)
-                st.plotly_chart(fig_overall_bar, use_container_width=True)
-
-            with col2:
-                # Calculate average overall progress
-                total_completion = sum(overall_progress.values()) / len(overall_progress)
-
-                # Create gauge chart for overall progress
-                fig_gauge = px.pie(
-                    values=[total_completion, 100-total_completion],
-                    names=["Completed", "Remaining"],
-                    hole=0.7,
-                    title=f"Overall Completion: {total_completion:.1f}%"
-                )
-                fig_gauge.update_layout(
-                    height=400,
-                    annotations=[dict(text=f"{total_completion:.1f}%", x=0.5, y=0.5, font_size=20, showarrow=False)]
-                )
-                fig_gauge.update_traces(marker=dict(colors=['#1f77b4', '#e0e0e0']))
-                st.plotly_chart(fig_gauge, use_container_width=True)
+            render_overall_summary(current_track, overall_progress)
 
     # Admin View: Monitor Student Progress
     if st.session_state["role"] == "admin":
         st.markdown("## 📈 Students' Progress Overview")
 
+        # One shared curriculum lookup for every student in both tabs
+        curriculum = manager.get_curriculum()
+
         # Create a tab view for different admin views
-        tab1, tab2 = st.tabs(["Class Summary", "Student Comparison"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Class Summary", "Student Comparison", "Deadline Radar", "Bulk Import"])
 
-        with tab1:
-            # Get all students with their career path selected
-            students = [user for user in user_data.keys() if user_data[user].get("career_path") is not None]
+        with tab1, perf.measure("render.class_summary"):
+            # Every student with a career path selected, as summary rows rather than full records
+            class_rows = {row["username"]: row for row in manager.query_rows(StudentQuery())}
+            students = list(class_rows)
 
             if not students:
                 st.info("No student data available yet.")
             else:
-                # Calculate progress data for all students
-                student_data = []
-
-                for student in students:
-                    career_path = user_data[student].get("career_path")
-                    if career_path and "progress" in user_data[student]:
-                        # Get topics for this career path
-                        topics_data = manager.get_topics(career_path)
-
-                        # Calculate progress for each phase
-                        phase_progress = {}
-
-                        for phase_name in topics_data.keys():
-                            phase_topics = topics_data[phase_name]
-                            all_subtopics_progress = []
-
-                            for topic_name, subtopics in phase_topics.items():
-                                if isinstance(subtopics, list):
-                                    for subtopic in subtopics:
-                                        subtopic_key = f"{career_path}_{phase_name}_{topic_name}_{subtopic}"
-                                        if subtopic_key in user_data[student]["progress"]:
-                                            all_subtopics_progress.append(
-                                                user_data[student]["progress"][subtopic_key].get("completion", 0)
-                                            )
-
-                            if all_subtopics_progress:
-                                phase_progress[phase_name] = sum(all_subtopics_progress) / len(all_subtopics_progress)
-
-                        # Calculate overall progress
-                        if phase_progress:
-                            overall = sum(phase_progress.values()) / len(phase_progress)
-
-                            # Add to student data
-                            student_data.append({
-                                "Student": student,
-                                "Career Path": career_path,
-                                "Overall Progress": overall,
-                                **phase_progress  # Add each phase as a separate column
-                            })
-
-                if student_data:
-                    # Create DataFrame
-                    student_df = pd.DataFrame(student_data)
+                # Per-student and per-phase averages from the precomputed rollups
+                rollups = manager.get_rollups(students)
+                progress_matrix = build_rollup_matrix(class_rows, rollups, curriculum, students)
+                student_df = class_summary(progress_matrix)
 
+                if not student_df.empty:
                     # Summary statistics
                     st.subheader("Class Progress Summary")
 
-                    # Career path distribution
-                    career_counts = student_df["Career Path"].value_counts().reset_index()
-                    career_counts.columns = ["Career Path", "Count"]
-
                     col1, col2 = st.columns(2)
 
                     with col1:
                         # Career path distribution pie chart
-                        fig_career = px.pie(
-                            career_counts,
-                            values="Count",
-                            names="Career Path",
-                            title="Career Path Distribution"
-                        )
-                        st.plotly_chart(fig_career, use_container_width=True)
+                        st.plotly_chart(create_career_distribution_chart(student_df), use_container_width=True)
 
                     with col2:
                         # Average progress by career path
-                        avg_by_career = student_df.groupby("Career Path")["Overall Progress"].mean().reset_index()
-
-                        fig_avg = px.bar(
-                            avg_by_career,
-                            x="Career Path",
-                            y="Overall Progress",
-                            title="Average Progress by Career Path",
-                            color="Career Path",
-                            text=[f"{v:.1f}%" for v in avg_by_career["Overall Progress"]]
-                        )
-                        st.plotly_chart(fig_avg, use_container_width=True)
+                        avg_by_career = career_averages(student_df)
+                        st.plotly_chart(create_career_average_chart(avg_by_career), use_container_width=True)
 
                     # Progress distribution histogram
-                    fig_hist = px.histogram(
-                        student_df,
-                        x="Overall Progress",
-                        nbins=10,
-                        title="Distribution of Student Progress",
-                        color="Career Path"
-                    )
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
-        with tab2:
-            # Get all students with their career path selected
-            students = [user for user in user_data.keys() if user_data[user].get("career_path") is not None]
+                    st.plotly_chart(create_progress_histogram(student_df), use_container_width=True)
 
-            if not students:
-                st.info("No student data available yet.")
+        with tab2, perf.measure("render.student_comparison"):
+            # Filters run as one paged query on the store; only the current page is loaded
+            col1, col2 = st.columns(2)
+            with col1:
+                selected_career = st.selectbox("Filter by Career Path", ["All"] + list(curriculum.tracks()))
+                completion_range = st.slider("Overall progress (%)", 0, 100, (0, 100), key="comparison_completion")
+                order_by = st.selectbox("Sort by", ["username", "completion", "last_activity"], key="comparison_order",
+                                        format_func=lambda order: {"username": "Name",
+                                                                   "completion": "Progress (highest first)",
+                                                                   "last_activity": "Last activity (latest first)"}[order])
+            with col2:
+                comparison_prefix = st.text_input("Name starts with", key="comparison_prefix")
+                active_since = st.date_input("Active since", value=None, key="comparison_active_since")
+                page_size = st.selectbox("Students per page", [10, 20, 50], key="comparison_page_size")
+
+            student_query = StudentQuery(
+                career_path=None if selected_career == "All" else selected_career,
+                name_prefix=comparison_prefix,
+                min_completion=completion_range[0] if completion_range[0] > 0 else None,
+                max_completion=completion_range[1] if completion_range[1] < 100 else None,
+                active_since=active_since,
+                order_by=order_by,
+                descending=order_by != "username",
+                page_size=page_size
+            )
+            student_query.page = st.session_state.get("comparison_page", 1) - 1
+            student_page = manager.query_students(student_query)
+            if student_query.page >= student_page.pages:
+                # Filters shrank the result; jump back to its last page
+                student_query.page = student_page.pages - 1
+                st.session_state["comparison_page"] = student_page.pages
+                student_page = manager.query_students(student_query)
+
+            if not student_page.total:
+                st.info("No students match these filters.")
             else:
-                # Career paths for filtering
-                career_paths = list(set(user_data[student].get("career_path") for student in students if user_data[student].get("career_path")))
-
-                # Filters
-                selected_career = st.selectbox("Filter by Career Path", ["All"] + career_paths)
-
-                # Filtered students
-                filtered_students = students
-                if selected_career != "All":
-                    filtered_students = [s for s in students if user_data[s].get("career_path") == selected_career]
-
-                # Limit to avoid overcrowding
-                max_students = st.slider("Maximum students to display", min_value=5, max_value=20, value=10)
-                if len(filtered_students) > max_students:
-                    filtered_students = filtered_students[:max_students]
-
-                if filtered_students:
-                    # Get phases for the selected career path(s)
-                    all_phases = set()
-                    for student in filtered_students:
-                        career_path = user_data[student].get("career_path")
-                        if career_path:
-                            topics_data = manager.get_topics(career_path)
-                            all_phases.update(topics_data.keys())
-
-                    # Create comparison data
-                    comparison_data = []
-
-                    for student in filtered_students:
-                        career_path = user_data[student].get("career_path")
-                        if career_path and "progress" in user_data[student]:
-                            # Calculate progress for each phase
-                            student_phases = {}
-
-                            # Get topics data for this career path
-                            topics_data = manager.get_topics(career_path)
-
-                            # Process each phase
-                            for phase_name in topics_data.keys():
-                                phase_topics = topics_data[phase_name]
-                                all_subtopics_progress = []
-
-                                for topic_name, subtopics in phase_topics.items():
-                                    if isinstance(subtopics, list):
-                                        for subtopic in subtopics:
-                                            subtopic_key = f"{career_path}_{phase_name}_{topic_name}_{subtopic}"
-                                            if subtopic_key in user_data[student]["progress"]:
-                                                all_subtopics_progress.append(
-                                                    user_data[student]["progress"][subtopic_key].get("completion", 0)
-                                                )
-
-                                if all_subtopics_progress:
-                                    phase_avg = sum(all_subtopics_progress) / len(all_subtopics_progress)
-                                    comparison_data.append({
-                                        "Student": student,
-                                        "Career Path": career_path,
-                                        "Phase": phase_name,
-                                        "Progress": phase_avg
-                                    })
-
-                    if comparison_data:
-                        # Create DataFrame
-                        comparison_df = pd.DataFrame(comparison_data)
-
-                        # Plot student comparison
-                        fig_compare = px.bar(
-                            comparison_df,
-                            x="Student",
-                            y="Progress",
-                            color="Phase",
-                            barmode="group",
-                            title="Student Progress by Phase",
-                            labels={"Progress": "Completion (%)"},
-                            hover_data=["Career Path"]
+                st.number_input("Page", min_value=1, max_value=student_page.pages, step=1, key="comparison_page")
+                st.caption(f"Page {student_query.page + 1} of {student_page.pages} · {student_page.total} matching students")
+
+                # Per-phase averages for the students on this page
+                page_records = {row["username"]: row for row in student_page.rows}
+                comparison_df = phase_progress_table(build_rollup_matrix(
+                    page_records, manager.get_rollups(student_page.usernames), curriculum, student_page.usernames
+                ))
+
+                if not comparison_df.empty:
+                    # Plot student comparison; whole cohorts fall back to per-phase distributions
+                    chart_scope = st.radio("Chart", ["This page", "All matching students"], horizontal=True,
+                                           key="comparison_chart_scope")
+                    chart_df = comparison_df
+                    if chart_scope == "All matching students" and student_page.total > len(student_page.rows):
+                        matching = {row["username"]: row for row in manager.query_rows(student_query)}
+                        chart_df = phase_progress_table(build_rollup_matrix(
+                            matching, manager.get_rollups(list(matching)), curriculum, list(matching)
+                        ))
+                    st.plotly_chart(create_comparison_chart(chart_df), use_container_width=True)
+
+                    # Show tabular data
+                    st.subheader("Detailed Progress Data")
+                    st.dataframe(comparison_df, use_container_width=True)
+
+                # Export streams every matching student, not just this page, into a temp file
+                col1, col2 = st.columns(2)
+                with col1:
+                    export_format = st.selectbox("Export format", list(FORMATS), key="export_format")
+                with col2:
+                    export_detail = st.selectbox("Export detail", ["phase", "subtopic"], key="export_detail",
+                                                 format_func=lambda detail: {"phase": "Phase averages",
+                                                                             "subtopic": "Every subtopic"}[detail])
+
+                if st.button("Prepare export"):
+                    old_export = st.session_state.pop("export_file", None)
+                    if old_export and os.path.exists(old_export[0]):
+                        os.remove(old_export[0])
+                    try:
+                        export_students = manager.query_usernames(student_query)
+                        path = export_to_file(manager, export_format, export_detail, export_students)
+                        st.session_state["export_file"] = (path, export_format, export_detail)
+                    except Exception as e:
+                        st.error(f"Export failed: {e}")
+
+                export_file = st.session_state.get("export_file")
+                if export_file and os.path.exists(export_file[0]):
+                    path, export_format, export_detail = export_file
+                    mime, extension = FORMATS[export_format]
+
+                    def remove_export():
+                        # The button has served its copy by now, so the temp file can go
+                        served = st.session_state.pop("export_file", None)
+                        if served and os.path.exists(served[0]):
+                            os.remove(served[0])
+
+                    with open(path, "rb") as f:
+                        st.download_button(
+                            label=f"Download Progress Data as {export_format.upper()}",
+                            data=f,
+                            file_name=f"student_progress_{export_detail}.{extension}",
+                            mime=mime,
+                            on_click=remove_export
                         )
-                        st.plotly_chart(fig_compare, use_container_width=True)
 
-                        # Show tabular data
-                        st.subheader("Detailed Progress Data")
-                        st.dataframe(comparison_df, use_container_width=True)
+        with tab3, perf.measure("render.deadline_radar"):
+            # Unfinished subtopics by latest deadline, answered from the shared deadline index
+            try:
+                deadline_index = manager.get_deadline_index()
+            except FlushTimeoutError as e:
+                # The store keeps failing; show the error instead of blocking this rerun
+                st.error(f"Deadline Radar is unavailable: {e}. Try again once the store recovers.")
+                deadline_index = DeadlineIndex()
+            today = date.today()
+            radar_days = st.number_input("Due within (days)", min_value=1, max_value=365, value=7,
+                                         key="radar_days")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Overdue", deadline_index.count_between(None, today - timedelta(days=1)))
+            col2.metric(f"Due in the next {radar_days} days",
+                        deadline_index.count_between(today, today + timedelta(days=radar_days)))
+            col3.metric("Open deadlines", len(deadline_index))
+
+            radar_scope = st.radio("Show", ["Overdue", "Due soon"], horizontal=True, key="radar_scope")
+            radar_limit = 1000
+            if radar_scope == "Overdue":
+                radar_rows = deadline_index.overdue(today, limit=radar_limit)
+            else:
+                radar_rows = deadline_index.due_within(radar_days, today, limit=radar_limit)
 
-                        # Add download button for CSV export
-                        csv = comparison_df.to_csv(index=False)
-                        st.download_button(
-                            label="Download Progress Data as CSV",
-                            data=csv,
-                            file_name="student_progress.csv",
-                            mime="text/csv"
-                        )
\ No newline at end of file
+            if not radar_rows:
+                st.info("Nothing to show.")
+            else:
+                radar_df = pd.DataFrame([
+                    (username, *curriculum.parts_for_key(key), deadline, (deadline - today).days, completion)
+                    for deadline, username, key, completion in radar_rows
+                ], columns=["Student", "Career Path", "Phase", "Topic", "Subtopic", "Deadline", "Days Left",
+                            "Completion"])
+                st.dataframe(radar_df, hide_index=True, use_container_width=True)
+                if len(radar_rows) == radar_limit:
+                    st.caption(f"Showing the first {radar_limit} rows.")
+
+            if reminder_scheduler is None:
+                st.caption("Set REMINDER_TRANSPORT to send deadline reminders automatically.")
+            else:
+                last_report = reminder_scheduler.last_report
+                st.caption(f"Last reminder run: {last_report.summary()}" if last_report else "No reminder run yet.")
+                if st.button("Send reminders now", key="send_reminders"):
+                    reminder_scheduler.request()
+                    st.info("Reminders are being sent in the background.")
+
+        with tab4:
+            st.markdown("Upload a users CSV (username, password, role, career_path, course_type, phone, email) "
+                        "and/or a progress CSV (username, track, phase, topic, subtopic, completion, deadline, "
+                        "timestamp).")
+            users_upload = st.file_uploader("Users CSV", type="csv", key="import_users")
+            progress_upload = st.file_uploader("Progress CSV", type="csv", key="import_progress")
+            skip_invalid = st.checkbox("Import valid rows even if some rows are invalid", key="import_skip_invalid")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                validate_clicked = st.button("Validate", disabled=not (users_upload or progress_upload))
+            with col2:
+                import_clicked = st.button("Import", type="primary", disabled=not (users_upload or progress_upload))
+
+            if validate_clicked or import_clicked:
+                def read_upload(upload):
+                    return csv.DictReader(io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")) if upload else None
+
+                report = bulk_import(manager, read_upload(users_upload), read_upload(progress_upload),
+                                     skip_invalid, dry_run=validate_clicked)
+                if report.saved:
+                    st.success(report.summary())
+                elif report.errors or import_clicked:
+                    st.error(report.summary())
+                else:
+                    st.info(report.summary())
+                if report.errors:
+                    st.dataframe(pd.DataFrame(report.errors[:500], columns=["File", "Line", "Error"]),
+                                 use_container_width=True)
+
+perf.end_rerun(os.environ.get("METRICS_FILE"))
+
+# Admin-only profiling panel with recent latencies of this or every session
+if st.session_state.get("logged_in") and st.session_state.get("role") == "admin":
+    with st.sidebar.expander("⏱️ Profiling"):
+        perf_scope = st.radio("Sessions", ["This session", "All sessions"], horizontal=True, key="perf_scope")
+        timings = perf.metrics.summary(st.session_state["perf_session"] if perf_scope == "This session" else None)
+        if timings:
+            st.dataframe(pd.DataFrame(timings).sort_values("p95_ms", ascending=False), hide_index=True,
+                         use_container_width=True)
+        else:
+            st.caption("No timings recorded yet.")
+        st.download_button("Download Prometheus metrics", perf.metrics.prometheus_text(),
+                           file_name="metrics.prom", mime="text/plain")
+        st.download_button("Download JSON metrics", json.dumps(perf.metrics.summary(), indent=2),
+                           file_name="metrics.json", mime="application/json")
+        if st.button("Reset timings"):
+            perf.metrics.reset()
@@ -0,0 +1,197 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from app_logging import get_logger
+
+log = get_logger("perf")
+
+METRIC_NAME = "milestone_tracker_latency_seconds"
+QUANTILES = (0.5, 0.95)
+
+# Session and page of the rerun running on this thread; background threads report as "-"
+_context = threading.local()
+
+
+class Metrics:
+    """Thread-safe latency samples keyed by (session, page, name).
+
+    Each series keeps its last window samples for percentiles plus lifetime
+    count and sum. The least recently updated series are dropped beyond
+    max_series, so ended sessions do not accumulate.
+    """
+
+    def __init__(self, window=500, max_series=5000):
+        self.window = window
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, session="-", page="-"):
+        key = (session, page, name)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [deque(maxlen=self.window), 0, 0.0]
+                while len(self._series) > self.max_series:
+                    self._series.popitem(last=False)
+            else:
+                self._series.move_to_end(key)
+            series[0].append(seconds)
+            series[1] += 1
+            series[2] += seconds
+
+    def _grouped(self, session=None):
+        """Return {(page, name): (recent samples, count, total)}, merged across sessions unless one is given"""
+        grouped = {}
+        with self._lock:
+            for (series_session, page, name), (samples, count, total) in self._series.items():
+                if session is not None and series_session != session:
+                    continue
+                group = grouped.setdefault((page, name), [[], 0, 0.0])
+                group[0].extend(samples)
+                group[1] += count
+                group[2] += total
+        return grouped
+
+    def summary(self, session=None):
+        """Return one row per page and name with count, p50, p95 and max of the recent samples (in ms)"""
+        rows = []
+        for (page, name), (samples, count, total) in sorted(self._grouped(session).items()):
+            p50, p95 = np.percentile(samples, [q * 100 for q in QUANTILES]) * 1000
+            rows.append({
+                "page": page,
+                "name": name,
+                "count": count,
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "max_ms": round(max(samples) * 1000, 2),
+                "total_s": round(total, 3)
+            })
+        return rows
+
+    def prometheus_text(self):
+        """Return every series, merged across sessions, in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Latency of storage, aggregation, chart and render calls per page",
+            f"# TYPE {METRIC_NAME} summary"
+        ]
+        for (page, name), (samples, count, total) in sorted(self._grouped().items()):
+            labels = f'page="{_escape(page)}",name="{_escape(name)}"'
+            for q, value in zip(QUANTILES, np.percentile(samples, [q * 100 for q in QUANTILES])):
+                lines.append(f'{METRIC_NAME}{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path):
+        """Write the metrics to file_path: Prometheus text for .prom/.txt, JSON otherwise"""
+        if os.path.splitext(file_path)[1] in (".prom", ".txt"):
+            content = self.prometheus_text()
+        else:
+            content = json.dumps({"generated": time.time(), "metrics": self.summary()}, indent=2)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(content)
+        os.replace(temp_path, file_path)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+def set_context(session, page):
+    """Attribute timings on this thread to a session and page"""
+    _context.session = session
+    _context.page = page
+
+
+def set_page(page):
+    _context.page = page
+
+
+def current_session():
+    return getattr(_context, "session", "-")
+
+
+@contextmanager
+def measure(name):
+    """Time the enclosed block under name for the current session and page"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record(name, time.perf_counter() - start, current_session(), getattr(_context, "page", "-"))
+
+
+def timed(name):
+    """Decorator form of measure"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class InstrumentedBackend:
+    """Proxy that times every public method call of a storage backend as storage.<method>"""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self._backend, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        wrapper = self._wrapped.get(name)
+        if wrapper is None:
+            wrapper = self._wrapped[name] = timed(f"storage.{name}")(attribute)
+        return wrapper
+
+
+def start_rerun(session, page):
+    """Begin timing one script run"""
+    set_context(session, page)
+    _context.rerun_start = time.perf_counter()
+
+
+def end_rerun(export_file=None, export_interval=10):
+    """Record the total time of the current script run.
+
+    Runs interrupted by st.rerun or st.stop never get here and are not
+    counted. If export_file is set, the metrics are written to it at most
+    once every export_interval seconds.
+    """
+    start = getattr(_context, "rerun_start", None)
+    if start is None:
+        return
+    metrics.record("rerun", time.perf_counter() - start, current_session(), getattr(_context, "page", "-"))
+    _context.rerun_start = None
+
+    global _last_export
+    if export_file and time.monotonic() - _last_export >= export_interval:
+        _last_export = time.monotonic()
+        try:
+            metrics.write(export_file)
+        except OSError as e:
+            log.error("writing metrics failed", path=export_file, error=str(e))
+
+
+_last_export = -math.inf
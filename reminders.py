@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import json
+import os
+import smtplib
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from email.message import EmailMessage
+
+from app_logging import get_logger
+from locking import FileLock
+from storage import load_json, save_json
+
+log = get_logger("reminders")
+
+# Subtopics named in one message; the rest are summarized as a count
+MAX_LISTED = 5
+
+
+class ReminderReport:
+    """Counts and failures from one reminder run"""
+
+    def __init__(self):
+        self.due = 0
+        self.students = 0
+        self.sent = 0
+        self.skipped = 0
+        self.no_contact = 0
+        self.failed = {}
+        self.finished_at = None
+
+    def summary(self):
+        """Return a one-line description of the run"""
+        return (f"Sent {self.sent} of {self.students} reminders for {self.due} due subtopics; "
+                f"{self.skipped} already reminded, {self.no_contact} without contact details, "
+                f"{len(self.failed)} failed")
+
+
+class FakeTransport:
+    """Transport that keeps messages in `sent`, and appends them to outbox_file, instead of sending them.
+
+    With contact_field None, messages are addressed to the username, so it
+    works for students without a phone number or email address.
+    """
+
+    def __init__(self, outbox_file=None, contact_field=None, delay=0):
+        self.outbox_file = outbox_file
+        self.contact_field = contact_field
+        self.delay = delay
+        self.sent = []
+
+    async def send(self, recipient, body):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append((recipient, body))
+        if self.outbox_file:
+            with open(self.outbox_file, "a") as f:
+                f.write(json.dumps({"to": recipient, "body": body}) + "\n")
+
+
+class TwilioSMSTransport:
+    """Sends SMS through Twilio to each student's "phone" profile field"""
+
+    contact_field = "phone"
+
+    def __init__(self, account_sid, auth_token, from_number):
+        try:
+            from twilio.rest import Client
+        except ImportError:
+            raise RuntimeError("SMS reminders require twilio (pip install twilio)")
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+
+    async def send(self, recipient, body):
+        # The Twilio client blocks, so each send runs on a worker thread
+        await asyncio.to_thread(self.client.messages.create, to=recipient, from_=self.from_number, body=body)
+
+
+class EmailTransport:
+    """Sends email over SMTP to each student's "email" profile field"""
+
+    contact_field = "email"
+
+    def __init__(self, host, port=587, sender=None, username=None, password=None, starttls=True):
+        self.host = host
+        self.port = port
+        self.sender = sender or username
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def _send(self, recipient, body):
+        message = EmailMessage()
+        message["Subject"] = "Upcoming deadlines in the Milestone Tracker"
+        message["From"] = self.sender
+        message["To"] = recipient
+        message.set_content(body)
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+    async def send(self, recipient, body):
+        await asyncio.to_thread(self._send, recipient, body)
+
+
+def create_transport(kind=None):
+    """Create the transport selected by REMINDER_TRANSPORT (fake, twilio or email)"""
+    kind = kind or os.environ.get("REMINDER_TRANSPORT", "fake")
+    if kind == "fake":
+        return FakeTransport(os.environ.get("REMINDER_OUTBOX", "reminder_outbox.jsonl"))
+    if kind == "twilio":
+        return TwilioSMSTransport(os.environ["TWILIO_ACCOUNT_SID"], os.environ["TWILIO_AUTH_TOKEN"],
+                                  os.environ["TWILIO_FROM_NUMBER"])
+    if kind == "email":
+        return EmailTransport(os.environ["SMTP_HOST"], int(os.environ.get("SMTP_PORT", 587)),
+                              os.environ.get("REMINDER_FROM_EMAIL"), os.environ.get("SMTP_USER"),
+                              os.environ.get("SMTP_PASSWORD"))
+    raise ValueError(f"Unknown reminder transport: {kind}")
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` sends per second in bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def send_all(messages, transport, workers=8, rate=5, attempts=3):
+    """Send (username, recipient, body) messages from a pool of workers; return {username: error} for failures"""
+    queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+    limiter = RateLimiter(rate)
+    failures = {}
+
+    async def worker():
+        while not queue.empty():
+            username, recipient, body = queue.get_nowait()
+            for attempt in range(1, attempts + 1):
+                await limiter.acquire()
+                try:
+                    await transport.send(recipient, body)
+                    failures.pop(username, None)
+                    break
+                except Exception as e:
+                    failures[username] = str(e)
+                    log.warning("sending reminder failed", username=username, attempt=attempt, error=str(e))
+                    if attempt < attempts:
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+
+    await asyncio.gather(*(worker() for _ in range(max(min(workers, len(messages)), 1))))
+    return failures
+
+
+def format_message(username, items, curriculum, today):
+    """Return the reminder text for one student's [(deadline, key, completion)] items, soonest first"""
+    lines = [f"Hi {username}, you have {len(items)} open deadline{'s' if len(items) != 1 else ''} "
+             f"in the ProITbridge Milestone Tracker:"]
+    for deadline, key, completion in items[:MAX_LISTED]:
+        _, _, topic, subtopic = curriculum.parts_for_key(key)
+        when = f"overdue since {deadline}" if deadline < today else f"due {deadline}"
+        lines.append(f"- {subtopic} ({topic}): {completion}% done, {when}")
+    if len(items) > MAX_LISTED:
+        lines.append(f"...and {len(items) - MAX_LISTED} more.")
+    return "\n".join(lines)
+
+
+def run_reminders(manager, transport, days=2, overdue_days=14, cooldown_days=1, workers=8, rate=5,
+                  state_file="reminders_sent.json", today=None, dry_run=False, attempts=3):
+    """Remind every student with unfinished subtopics overdue or due within days; return a ReminderReport.
+
+    A subtopic is reminded about again only once cooldown_days have passed
+    or its deadline changed; state_file records what was sent. Its lock is
+    held only to claim the due reminders and to record the outcome, not
+    while sending, so an overlapping run skips the claimed students instead
+    of waiting. Failed sends release their claims; a run killed mid-send
+    keeps them, so nobody is reminded twice.
+    """
+    today = today or date.today()
+    report = ReminderReport()
+    curriculum = manager.get_curriculum()
+    due = {}
+    for deadline, username, key, completion in manager.get_deadline_index().due_between(
+            today - timedelta(days=overdue_days), today + timedelta(days=days)):
+        due.setdefault(username, []).append((deadline, key, completion))
+        report.due += 1
+
+    # Contacts are read from the store before the state file is locked
+    if transport.contact_field is None:
+        contacts = {username: username for username in due}
+    else:
+        contacts = {}
+        for records in manager.iter_user_records(list(due)):
+            for username, record in records.items():
+                if record.get(transport.contact_field):
+                    contacts[username] = record[transport.contact_field]
+
+    recent = str(today - timedelta(days=cooldown_days - 1))
+    messages = []
+    claims = {}
+    with FileLock(state_file):
+        state = load_json(state_file)
+        pending = {}
+        for username, items in due.items():
+            sent = state.get(username, {})
+            if all(sent.get(key, ["", ""])[0] == str(deadline) and sent[key][1] >= recent
+                   for deadline, key, _ in items):
+                report.skipped += 1
+            else:
+                pending[username] = items
+        report.students = len(pending)
+
+        for username, items in pending.items():
+            if username not in contacts:
+                report.no_contact += 1
+                continue
+            messages.append((username, contacts[username], format_message(username, items, curriculum, today)))
+
+        if not dry_run and messages:
+            # Record the reminders as sent before sending, remembering what they replace
+            for username, _, _ in messages:
+                sent = state.setdefault(username, {})
+                claims[username] = {key: (sent.get(key), [str(deadline), str(today)])
+                                    for deadline, key, _ in pending[username]}
+                sent.update((key, claim) for key, (_, claim) in claims[username].items())
+            save_json(state_file, state)
+
+    if claims:
+        report.failed = asyncio.run(send_all(messages, transport, workers, rate, attempts))
+        report.sent = len(messages) - len(report.failed)
+        with FileLock(state_file):
+            state = load_json(state_file)
+            for username in report.failed:
+                sent = state.get(username, {})
+                for key, (previous, claim) in claims[username].items():
+                    # Release the claim unless a later run has replaced it
+                    if sent.get(key) != claim:
+                        continue
+                    if previous is None:
+                        del sent[key]
+                    else:
+                        sent[key] = previous
+            # Forget deadlines too old to be reminded about again
+            cutoff = str(today - timedelta(days=overdue_days))
+            state = {username: kept for username, sent in state.items()
+                     if (kept := {key: value for key, value in sent.items() if value[0] >= cutoff})}
+            save_json(state_file, state)
+
+    report.finished_at = time.time()
+    log.info("reminder run finished", due=report.due, sent=report.sent, skipped=report.skipped,
+             no_contact=report.no_contact, failed=len(report.failed), dry_run=dry_run)
+    return report
+
+
+class ReminderScheduler(threading.Thread):
+    """Daemon thread calling run_reminders every `interval` seconds, or sooner when request() is called.
+
+    Sending runs on this thread's own event loop, so Streamlit reruns never
+    wait for it.
+    """
+
+    def __init__(self, manager_factory, transport, interval=3600, **options):
+        super().__init__(name="reminders", daemon=True)
+        self.manager_factory = manager_factory
+        self.transport = transport
+        self.interval = interval
+        self.options = options
+        self.last_report = None
+        self._wake = threading.Event()
+
+    def request(self):
+        """Ask for a run without waiting for the next interval"""
+        self._wake.set()
+
+    def run(self):
+        manager = self.manager_factory()
+        while True:
+            try:
+                self.last_report = run_reminders(manager, self.transport, **self.options)
+            except Exception:
+                log.exception("reminder run failed")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Start the process-wide scheduler if REMINDER_TRANSPORT is set; return it, or None when disabled"""
+    global _scheduler
+    if not os.environ.get("REMINDER_TRANSPORT"):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            from data_manager import DataManager
+
+            _scheduler = ReminderScheduler(
+                DataManager, create_transport(), float(os.environ.get("REMINDER_INTERVAL", 3600)),
+                days=int(os.environ.get("REMINDER_DAYS", 2)),
+                workers=int(os.environ.get("REMINDER_WORKERS", 8)),
+                rate=float(os.environ.get("REMINDER_RATE", 5))
+            )
+            _scheduler.start()
+        return _scheduler
+
+
+if __name__ == "__main__":
+    from data_manager import DataManager
+
+    parser = argparse.ArgumentParser(description="Send deadline reminders once")
+    parser.add_argument("--transport", choices=["fake", "twilio", "email"], default="fake")
+    parser.add_argument("--days", type=int, default=2, help="Remind about deadlines due within this many days")
+    parser.add_argument("--overdue-days", type=int, default=14, help="Stop reminding this many days after a deadline")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent sends")
+    parser.add_argument("--rate", type=float, default=5, help="Sends per second")
+    parser.add_argument("--dry-run", action="store_true", help="Only count who would be reminded")
+    args = parser.parse_args()
+
+    report = run_reminders(DataManager(), create_transport(args.transport), args.days, args.overdue_days,
+                           workers=args.workers, rate=args.rate, dry_run=args.dry_run)
+    for username, error in report.failed.items():
+        print(f"{username}: {error}", file=sys.stderr)
+    print(report.summary())
+    if report.failed:
+        sys.exit(1)
@@ -0,0 +1,71 @@
+class UserRollup:
+    """Running per-topic completion totals for one user.
+
+    Each (track, phase, topic) keeps the sum and count of its stored subtopic
+    entries, so a single subtopic write updates the rollup in O(1) and phase
+    and overall averages are read without scanning raw progress. Entries
+    without a phase (legacy DataManager.save_progress keys) are not counted.
+    """
+
+    def __init__(self, topics=None):
+        self.topics = topics if topics is not None else {}
+
+    def apply(self, track, phase, topic, old_value, new_value):
+        """Fold one subtopic change into the totals; old_value is None for a new entry"""
+        if not (track and phase and topic):
+            return
+        slot = self.topics.setdefault((track, phase, topic), [0, 0])
+        if old_value is None:
+            slot[0] += new_value
+            slot[1] += 1
+        else:
+            slot[0] += new_value - old_value
+
+    def topic_totals(self, track, phase, topic):
+        """Return (sum, count) of stored completion values for a topic"""
+        total, count = self.topics.get((track, phase, topic), (0, 0))
+        return total, count
+
+    def phase_totals(self, track):
+        """Return {phase: (sum, count)} for a track, in insertion order"""
+        totals = {}
+        for (topic_track, phase, _), (total, count) in self.topics.items():
+            if topic_track == track and count:
+                phase_total, phase_count = totals.get(phase, (0, 0))
+                totals[phase] = (phase_total + total, phase_count + count)
+        return totals
+
+    def phase_averages(self, track):
+        """Return {phase: mean completion of its stored entries} for a track"""
+        return {phase: total / count for phase, (total, count) in self.phase_totals(track).items()}
+
+    def overall_average(self, track):
+        """Return the mean of the phase averages for a track, or None without data"""
+        averages = self.phase_averages(track)
+        return sum(averages.values()) / len(averages) if averages else None
+
+    def to_json(self):
+        """Return a JSON-serializable {track: {phase: {topic: [sum, count]}}} dict"""
+        nested = {}
+        for (track, phase, topic), slot in self.topics.items():
+            nested.setdefault(track, {}).setdefault(phase, {})[topic] = list(slot)
+        return nested
+
+    @classmethod
+    def from_json(cls, nested):
+        """Rebuild a rollup from to_json output"""
+        return cls({
+            (track, phase, topic): list(slot)
+            for track, phases in nested.items()
+            for phase, topics in phases.items()
+            for topic, slot in topics.items()
+        })
+
+    @classmethod
+    def from_progress(cls, progress, key_index):
+        """Build a rollup from a flat progress dict using a key -> parts index"""
+        rollup = cls()
+        for key, entry in progress.items():
+            track, phase, topic, _ = key_index.get(key, ("", "", "", key))
+            rollup.apply(track, phase, topic, None, entry.get("completion", 0))
+        return rollup
@@ -0,0 +1,76 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ("json", "compact", "msgpack")
+
+
+def default_format():
+    """Return the format new files are written in (TRACKER_FILE_FORMAT, default "json")"""
+    fmt = os.environ.get("TRACKER_FILE_FORMAT", "json")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown TRACKER_FILE_FORMAT {fmt!r}, expected one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("The msgpack file format requires msgpack (pip install msgpack)")
+    return msgpack
+
+
+def dumps_compact(value):
+    """Encode one value as JSON without whitespace, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads_json(raw):
+    """Decode JSON bytes, with orjson when it is installed"""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def dumps(data, fmt="json"):
+    """Encode data as bytes in one of FORMATS.
+
+    "json" is the readable indent=4 layout. "compact" drops the whitespace
+    but keeps each top-level entry on its own line, so JSONRecordIndex can
+    still find one user's record without parsing the rest. "msgpack" is a
+    binary snapshot, smallest and fastest to load, that is always read whole.
+    """
+    if fmt == "json":
+        return json.dumps(data, indent=4).encode()
+    if fmt == "compact":
+        if not isinstance(data, dict) or not data:
+            return dumps_compact(data)
+        lines = b",\n".join(dumps_compact(str(key)) + b":" + dumps_compact(value) for key, value in data.items())
+        return b"{\n" + lines + b"\n}"
+    if fmt == "msgpack":
+        return _msgpack().packb(data, use_bin_type=True)
+    raise ValueError(f"Unknown file format {fmt!r}")
+
+
+def detect_format(raw):
+    """Return "msgpack" or "json" for file contents; compact files are JSON"""
+    head = raw[:64].lstrip()
+    return "json" if not head or head[:1] in (b"{", b"[") else "msgpack"
+
+
+def loads(raw):
+    """Decode file contents written in any of FORMATS; empty contents decode to {}"""
+    if detect_format(raw) == "json":
+        # Only a whitespace-only head needs the full strip
+        return {} if not raw[:64].strip() and not raw.strip() else loads_json(raw)
+    msgpack = _msgpack()
+    try:
+        return msgpack.unpackb(raw, strict_map_key=False)
+    except Exception as e:
+        # msgpack's own errors do not all derive from ValueError
+        raise ValueError(f"Invalid msgpack data: {e}") from e
@@ -0,0 +1,1208 @@
+import argparse
+import copy
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import serializers
+from app_logging import get_logger
+from locking import ConcurrentUpdateError, FileLock
+from rollups import UserRollup
+from student_query import StudentPage, filter_students
+
+log = get_logger("storage")
+
+
+def load_json(file_path):
+    """Load a JSON or msgpack store file safely; the format is detected from its contents"""
+    try:
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                return serializers.loads(f.read())
+        return {}
+    except (FileNotFoundError, ValueError) as e:
+        log.error("loading file failed", path=file_path, error=str(e))
+        return {}
+
+
+def save_json(file_path, data, fmt=None):
+    """Save data safely using atomic write, in fmt or the configured file format"""
+    encoded = serializers.dumps(data, fmt or serializers.default_format())
+    # A unique temp file per write keeps concurrent writers from clobbering each other's
+    directory, name = os.path.split(os.path.abspath(file_path))
+    fd, temp_file = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(encoded)
+        os.replace(temp_file, file_path)
+    except Exception:
+        log.exception("saving file failed", path=file_path)
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def convert_file(file_path, fmt):
+    """Rewrite a store file in fmt under its lock; return (bytes before, bytes after)"""
+    with FileLock(file_path):
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        # Decode strictly: a file that cannot be read must not be rewritten as {}
+        save_json(file_path, serializers.loads(raw), fmt)
+        return len(raw), os.path.getsize(file_path)
+
+
+class CachedJSONFile:
+    """A parsed JSON file kept in memory until its inode, mtime or size changes.
+
+    Writes through save() refresh the cached copy directly, so readers in the
+    same process never re-parse after their own writes. The returned dict is
+    shared and must be treated as read-only. Hold `lock` across a
+    load-modify-save cycle so other threads and processes cannot interleave.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock = FileLock(file_path)
+        self._cache_lock = threading.RLock()
+        self._signature = None
+        self._data = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.file_path)
+            # save_json swaps in a new file, so the inode changes even when mtime and size do not
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Return the parsed file, re-reading it only if it changed on disk"""
+        with self._cache_lock:
+            signature = self._stat()
+            if self._data is None or signature != self._signature:
+                self._data = load_json(self.file_path)
+                self._signature = signature
+            return self._data
+
+    def save(self, data):
+        """Write data to the file and make it the cached copy"""
+        with self.lock, self._cache_lock:
+            save_json(self.file_path, data)
+            self._data = data
+            self._signature = self._stat()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_file_cache(cls, file_path):
+    """Return the process-wide cls(file_path).
+
+    main.py builds a new backend on every rerun; sharing the per-file caches
+    keeps them warm across reruns and sessions instead of starting empty.
+    """
+    key = (cls, os.path.abspath(file_path))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = cls(file_path)
+        return _shared[key]
+
+
+class JSONRecordIndex:
+    """Byte spans of each top-level value in a JSON object file written by save_json.
+
+    Lets one user's record be read, or replaced in a fresh copy of the file,
+    without parsing anyone else's. The spans come from one regex pass over
+    the memory-mapped file and are cached per file version. Only the "json"
+    (indent=4) and "compact" layouts are indexed; for anything else, such as
+    msgpack snapshots, callers fall back to a full load.
+    """
+
+    # Top-level keys are the only lines starting with a quote, after four spaces
+    # in the indented layout and none in the compact one
+    _KEY_LINE = re.compile(rb'^(?:    )?("(?:[^"\\\n]|\\.)*"): ?', re.MULTILINE)
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._layout = None
+        self._spans = None
+
+    @staticmethod
+    def _signature_of(f):
+        stat = os.fstat(f.fileno())
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _scan(self, f, size):
+        """Return (layout, {key: (start, end)}) for the file open as f, or (None, None) if it cannot be indexed"""
+        if size < 2:
+            return None, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = data.rfind(b"}")
+            if data[:1] != b"{" or end < 0:
+                return None, None
+            if data[:7] == b'{\n    "':
+                layout = "json"
+            elif data[:3] == b'{\n"':
+                layout = "compact"
+            elif not data[1:end].strip():
+                # Empty files are rewritten whole on their first insert
+                return "json", {}
+            else:
+                return None, None
+            spans = {}
+            matches = list(self._KEY_LINE.finditer(data))
+            for i, match in enumerate(matches):
+                start = match.end()
+                stop = matches[i + 1].start() if i + 1 < len(matches) else end
+                while stop > start and data[stop - 1] in b" \t\r\n":
+                    stop -= 1
+                if data[stop - 1] == ord(","):
+                    stop -= 1
+                spans[json.loads(match.group(1))] = (start, stop)
+            return layout, spans
+
+    def _spans_for(self, f):
+        signature = self._signature_of(f)
+        with self._lock:
+            if signature != self._signature:
+                self._layout, self._spans = self._scan(f, signature[2])
+                self._signature = signature
+            return self._layout, self._spans
+
+    def read(self, key):
+        """Return (indexed, value); value is None if key is absent, indexed False if the file cannot be indexed"""
+        try:
+            f = open(self.file_path, "rb")
+        except FileNotFoundError:
+            return True, None
+        with f:
+            _, spans = self._spans_for(f)
+            if spans is None:
+                return False, None
+            span = spans.get(key)
+            if span is None:
+                return True, None
+            f.seek(span[0])
+            return True, serializers.loads_json(f.read(span[1] - span[0]))
+
+    def keys(self):
+        """Return the top-level keys in file order, or None if the file cannot be indexed"""
+        try:
+            f = open(self.file_path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            _, spans = self._spans_for(f)
+            return None if spans is None else list(spans)
+
+    def read_many(self, keys):
+        """Return {key: value} for the given keys present in the file, or None if it cannot be indexed"""
+        try:
+            f = open(self.file_path, "rb")
+        except FileNotFoundError:
+            return {}
+        with f:
+            _, spans = self._spans_for(f)
+            if spans is None:
+                return None
+            values = {}
+            for key in keys:
+                span = spans.get(key)
+                if span is not None:
+                    f.seek(span[0])
+                    values[key] = serializers.loads_json(f.read(span[1] - span[0]))
+            return values
+
+    def replace(self, key, value):
+        """Write a copy of the file with key's value replaced; return False if key is not indexed.
+
+        Everything around the value is copied byte for byte. The caller
+        holds the file's FileLock.
+        """
+        with open(self.file_path, "rb") as f:
+            layout, spans = self._spans_for(f)
+            if not spans or key not in spans:
+                return False
+            start, stop = spans[key]
+            # Keep the file's own layout so it stays indexable
+            if layout == "compact":
+                encoded = serializers.dumps_compact(value)
+            else:
+                encoded = json.dumps(value, indent=4).replace("\n", "\n    ").encode()
+            directory, name = os.path.split(os.path.abspath(self.file_path))
+            fd, temp_file = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    remaining = start
+                    while remaining:
+                        chunk = f.read(min(remaining, 1 << 20))
+                        out.write(chunk)
+                        remaining -= len(chunk)
+                    out.write(encoded)
+                    f.seek(stop)
+                    shutil.copyfileobj(f, out)
+                os.replace(temp_file, self.file_path)
+            except Exception:
+                log.exception("saving file failed", path=self.file_path)
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                raise
+
+        # Shift the spans behind the replaced value instead of rescanning
+        delta = len(encoded) - (stop - start)
+        spans = {name: (s + delta, e + delta) if s > start else (s, e) for name, (s, e) in spans.items()}
+        spans[key] = (start, start + len(encoded))
+        with open(self.file_path, "rb") as f:
+            signature = self._signature_of(f)
+        with self._lock:
+            self._signature, self._layout, self._spans = signature, layout, spans
+        return True
+
+
+def check_versions(username, items, stored_versions):
+    """Return {key: next version} for (key, parts, entry) items or raise ConcurrentUpdateError.
+
+    An entry carrying a "version" is a compare-and-swap: it must equal the
+    stored version it was read from. Entries without one overwrite blindly.
+    """
+    conflicts = [
+        key for key, _, entry in items
+        if entry.get("version") is not None and entry["version"] != stored_versions.get(key, 0)
+    ]
+    if conflicts:
+        raise ConcurrentUpdateError(username, conflicts)
+    return {key: stored_versions.get(key, 0) + 1 for key, _, _ in items}
+
+
+def progress_key(track, phase, topic, subtopic):
+    """Build the flat user_data.json key for a subtopic"""
+    return "_".join(part for part in (track, phase, topic, subtopic) if part)
+
+
+def build_key_index(topics):
+    """Map every known flat progress key to its (track, phase, topic, subtopic) parts"""
+    index = {}
+    for track, phases in topics.items():
+        for phase, phase_topics in phases.items():
+            for topic, subtopics in phase_topics.items():
+                if not isinstance(subtopics, list):
+                    continue
+                for subtopic in subtopics:
+                    index[progress_key(track, phase, topic, subtopic)] = (track, phase, topic, subtopic)
+                    # Keys written by DataManager.save_progress carry no phase
+                    index.setdefault(progress_key(track, None, topic, subtopic), (track, "", topic, subtopic))
+    return index
+
+
+class StorageBackend:
+    """Interface for the user, profile and progress stores behind DataManager.
+
+    Progress entries use the user_data.json shape: a flat key per subtopic
+    mapping to {"completion", "deadlines", "link", "editing", "timestamp",
+    "version"}. See check_versions for how "version" guards concurrent writes.
+    These flat entries are the only stored progress model; DataManager
+    derives the nested per-track view from them.
+    The (track, phase, topic, subtopic) parts are passed alongside the key so
+    indexed backends can query by curriculum position.
+    """
+
+    def get_user(self, username):
+        raise NotImplementedError
+
+    def save_user(self, username, hashed_password, role):
+        raise NotImplementedError
+
+    def register_user(self, username, hashed_password, role):
+        """Create a user and their empty profile; return False if the name is taken"""
+        if self.get_user(username):
+            return False
+        self.save_user(username, hashed_password, role)
+        self.initialize_user(username)
+        return True
+
+    def initialize_user(self, username):
+        raise NotImplementedError
+
+    def get_user_record(self, username):
+        raise NotImplementedError
+
+    def get_all_user_records(self):
+        raise NotImplementedError
+
+    def iter_user_records(self, usernames=None, chunk_size=500):
+        """Yield {username: record} dicts of at most chunk_size users (default: every user).
+
+        This default loads every record first; backends that can read a
+        chunk at a time override it to keep memory bounded.
+        """
+        user_data = self.get_all_user_records()
+        usernames = list(user_data) if usernames is None else [u for u in usernames if u in user_data]
+        for start in range(0, len(usernames), chunk_size):
+            yield {username: user_data[username] for username in usernames[start:start + chunk_size]}
+
+    def update_user_fields(self, username, fields):
+        raise NotImplementedError
+
+    def save_progress_entry(self, username, key, parts, entry):
+        self.save_progress_entries(username, [(key, parts, entry)])
+
+    def save_progress_entries(self, username, items):
+        """Persist (key, parts, entry) items for one user in a single atomic write"""
+        raise NotImplementedError
+
+    def save_progress_batches(self, batches):
+        """Persist {username: items} for several users as one group commit.
+
+        A user whose items fail the version check is skipped as a whole;
+        returns {username: conflicting keys} for those users.
+        """
+        conflicts = {}
+        for username, items in batches.items():
+            try:
+                self.save_progress_entries(username, items)
+            except ConcurrentUpdateError as e:
+                conflicts[username] = e.keys
+        return conflicts
+
+    def save_user_records(self, user_data, key_index):
+        raise NotImplementedError
+
+    def import_records(self, accounts, profiles, progress):
+        """Bulk-load users, profile fields and progress in one batched write.
+
+        accounts is {username: {"password", "role"}} and only creates missing
+        users; profiles is {username: {field: value}}; progress is
+        {username: [(key, parts, entry)]}, written without version checks.
+        """
+        raise NotImplementedError
+
+    def get_rollups(self, usernames=None, records=None):
+        """Return {username: UserRollup}, or None for users whose rollup must be rebuilt.
+
+        records is an optional {username: record} the caller already loaded;
+        backends that keep rollups in the records read them from it instead
+        of loading each record again.
+        """
+        raise NotImplementedError
+
+    def query_students(self, query, key_index):
+        """Return one StudentPage for a StudentQuery; this default filters every record in memory"""
+        user_data = self.get_all_user_records()
+        rollups = self.get_rollups(list(user_data), user_data)
+        for username, rollup in rollups.items():
+            if rollup is None:
+                rollups[username] = UserRollup.from_progress(user_data[username].get("progress", {}), key_index)
+        return filter_students(user_data, rollups, query)
+
+    def save_rollups(self, rollups):
+        """Replace the stored rollups for the given {username: UserRollup}"""
+        raise NotImplementedError
+
+
+class JSONBackend(StorageBackend):
+    """Whole-file JSON storage, suitable for small installs.
+
+    Every read-modify-write holds a FileLock on the file it rewrites, so
+    several sessions or server processes can write without losing updates.
+
+    Progress lives only in user_data.json. Entries found in a legacy nested
+    progress.json are folded in once, after which that file is renamed to
+    progress.json.migrated.
+
+    Single-user reads and writes go through a JSONRecordIndex, so a student
+    session parses and re-serializes only its own record.
+    """
+
+    def __init__(self, users_file="users.json", progress_file="progress.json",
+                 user_data_file="user_data.json"):
+        self.users_file = users_file
+        self.progress_file = progress_file
+        self.user_data_file = user_data_file
+        for file_path in (self.users_file, self.user_data_file):
+            if not os.path.exists(file_path):
+                with FileLock(file_path):
+                    if not os.path.exists(file_path):
+                        save_json(file_path, {})
+        self._users = shared_file_cache(CachedJSONFile, self.users_file)
+        self._user_data_lock = FileLock(self.user_data_file)
+        self._records = shared_file_cache(JSONRecordIndex, self.user_data_file)
+        # Parsed copy for files the index cannot read, such as msgpack snapshots
+        self._snapshot = shared_file_cache(CachedJSONFile, self.user_data_file)
+        if os.path.exists(self.progress_file):
+            self._fold_legacy_progress()
+
+    def _fold_legacy_progress(self):
+        """Copy nested progress.json entries missing from user_data.json, then retire the file"""
+        with self._user_data_lock:
+            legacy = load_json(self.progress_file)
+            if not any(legacy.values()):
+                return
+            user_data = load_json(self.user_data_file)
+            for username, tracks in legacy.items():
+                record = user_data.setdefault(username, {"career_path": None, "progress": {}})
+                progress = record.setdefault("progress", {})
+                for track, topics in tracks.items():
+                    for topic, subtopics in topics.items():
+                        for subtopic, data in subtopics.items():
+                            progress.setdefault(progress_key(track, None, topic, subtopic), {
+                                "completion": data.get("progress", 0),
+                                "timestamp": data.get("timestamp")
+                            })
+            save_json(self.user_data_file, user_data)
+            os.replace(self.progress_file, f"{self.progress_file}.migrated")
+
+    def get_user(self, username):
+        return self._users.load().get(username)
+
+    def save_user(self, username, hashed_password, role):
+        with self._users.lock:
+            users = dict(self._users.load())
+            users[username] = {"password": hashed_password, "role": role}
+            self._users.save(users)
+
+    def register_user(self, username, hashed_password, role):
+        with self._users.lock:
+            users = self._users.load()
+            if username in users:
+                return False
+            self._users.save({**users, username: {"password": hashed_password, "role": role}})
+
+        with self._user_data_lock:
+            user_data = load_json(self.user_data_file)
+            if username not in user_data:
+                user_data[username] = {"career_path": None, "progress": {}, "rollups": {}}
+                save_json(self.user_data_file, user_data)
+        return True
+
+    def initialize_user(self, username):
+        with self._user_data_lock:
+            user_data = load_json(self.user_data_file)
+            if username not in user_data:
+                user_data[username] = {"career_path": None, "progress": {}, "rollups": {}}
+                save_json(self.user_data_file, user_data)
+
+    def _read_record(self, username):
+        """Return one user's record, parsing the whole file only if it cannot be indexed"""
+        indexed, record = self._records.read(username)
+        return record if indexed else copy.deepcopy(self._snapshot.load().get(username))
+
+    def get_user_record(self, username):
+        return self._read_record(username)
+
+    def _record_names(self):
+        """Return every username in user_data.json, in file order"""
+        usernames = self._records.keys()
+        return list(self._snapshot.load()) if usernames is None else usernames
+
+    def _read_records(self, usernames):
+        """Return {username: record} for the given users, parsing the whole file only if it cannot be indexed"""
+        records = self._records.read_many(usernames)
+        if records is None:
+            snapshot = self._snapshot.load()
+            records = {username: copy.deepcopy(snapshot[username]) for username in usernames if username in snapshot}
+        return records
+
+    def get_all_user_records(self):
+        return load_json(self.user_data_file)
+
+    def iter_user_records(self, usernames=None, chunk_size=500):
+        # Each chunk is parsed from its records' byte spans, so memory follows the chunk, not the cohort
+        usernames = self._record_names() if usernames is None else list(usernames)
+        for start in range(0, len(usernames), chunk_size):
+            yield self._read_records(usernames[start:start + chunk_size])
+
+    def update_user_fields(self, username, fields):
+        with self._user_data_lock:
+            _, record = self._records.read(username)
+            if record is not None and self._records.replace(username, {**record, **fields}):
+                return
+            user_data = load_json(self.user_data_file)
+            user_data.setdefault(username, {"progress": {}}).update(fields)
+            save_json(self.user_data_file, user_data)
+
+    def save_progress_entries(self, username, items):
+        with self._user_data_lock:
+            _, record = self._records.read(username)
+            # New users, or a file the index cannot read, take the whole-file path
+            user_data = load_json(self.user_data_file) if record is None else None
+            if user_data is not None:
+                record = user_data.get(username, {})
+            progress = record.get("progress", {})
+            versions = check_versions(username, items, {key: entry.get("version", 0) for key, entry in progress.items()})
+            batch = [(key, parts, {**entry, "version": versions[key]}) for key, parts, entry in items]
+            if user_data is None:
+                record.setdefault("progress", {})
+                self._apply_progress(record, batch)
+                self._records.replace(username, record)
+            else:
+                self._store_progress(user_data, {username: batch})
+
+        # Callers keep editing their copies, so hand them the stored versions
+        for key, _, entry in items:
+            entry["version"] = versions[key]
+
+    def save_progress_batches(self, batches):
+        if len(batches) == 1:
+            return super().save_progress_batches(batches)
+        # One load and one rewrite of user_data.json for every user in the batch
+        conflicts, stored_versions, written = {}, {}, {}
+        with self._user_data_lock:
+            user_data = load_json(self.user_data_file)
+            for username, items in batches.items():
+                progress = user_data.get(username, {}).get("progress", {})
+                try:
+                    versions = check_versions(username, items,
+                                              {key: entry.get("version", 0) for key, entry in progress.items()})
+                except ConcurrentUpdateError as e:
+                    conflicts[username] = e.keys
+                    continue
+                stored_versions[username] = versions
+                written[username] = [(key, parts, {**entry, "version": versions[key]}) for key, parts, entry in items]
+            if written:
+                self._store_progress(user_data, written)
+
+        for username, versions in stored_versions.items():
+            for key, _, entry in batches[username]:
+                entry["version"] = versions[key]
+        return conflicts
+
+    def _store_progress(self, user_data, batches):
+        """Write {username: [(key, parts, entry)]} into user_data.json; the caller holds its lock"""
+        for username, items in batches.items():
+            record = user_data.setdefault(username, {"career_path": items[0][1][0] or None, "progress": {}})
+            record.setdefault("progress", {})
+            self._apply_progress(record, items)
+        save_json(self.user_data_file, user_data)
+
+    def _apply_progress(self, record, items):
+        """Store items in a user record, keeping its rollups current"""
+        progress = record["progress"]
+        # Rollups are kept current incrementally once they exist; older
+        # records without them are rebuilt on the next get_rollups
+        rollup = None
+        if "rollups" in record or not progress:
+            rollup = UserRollup.from_json(record.get("rollups", {}))
+        for key, parts, entry in items:
+            if rollup is not None:
+                old_value = progress[key].get("completion", 0) if key in progress else None
+                rollup.apply(parts[0], parts[1], parts[2], old_value, entry.get("completion", 0))
+            progress[key] = entry
+        if rollup is not None:
+            record["rollups"] = rollup.to_json()
+
+    def save_user_records(self, user_data, key_index):
+        for record in user_data.values():
+            record["rollups"] = UserRollup.from_progress(record.get("progress", {}), key_index).to_json()
+        with self._user_data_lock:
+            save_json(self.user_data_file, user_data)
+
+    def import_records(self, accounts, profiles, progress):
+        # One rewrite of users.json and one of user_data.json for the whole batch
+        with self._users.lock:
+            users = self._users.load()
+            new_accounts = {username: account for username, account in accounts.items() if username not in users}
+            if new_accounts:
+                self._users.save({**users, **new_accounts})
+
+        with self._user_data_lock:
+            user_data = load_json(self.user_data_file)
+            for username in accounts:
+                user_data.setdefault(username, {"career_path": None, "progress": {}, "rollups": {}})
+            for username, fields in profiles.items():
+                user_data.setdefault(username, {"progress": {}}).update(fields)
+            batches = {}
+            for username, items in progress.items():
+                stored = user_data.get(username, {}).get("progress", {})
+                versions = check_versions(username, items, {key: entry.get("version", 0) for key, entry in stored.items()})
+                batches[username] = [(key, parts, {**entry, "version": versions[key]}) for key, parts, entry in items]
+            self._store_progress(user_data, batches)
+
+    def get_rollups(self, usernames=None, records=None):
+        if usernames is None:
+            records = records if records is not None else self._snapshot.load()
+            usernames = list(records)
+        rollups = {}
+        for username in usernames:
+            record = records.get(username) if records is not None else None
+            if record is None:
+                record = self._read_record(username) or {}
+            if "rollups" in record:
+                rollups[username] = UserRollup.from_json(record["rollups"])
+            else:
+                rollups[username] = None if record.get("progress") else UserRollup()
+        return rollups
+
+    def save_rollups(self, rollups):
+        with self._user_data_lock:
+            user_data = load_json(self.user_data_file)
+            for username, rollup in rollups.items():
+                user_data.setdefault(username, {"career_path": None, "progress": {}})["rollups"] = rollup.to_json()
+            save_json(self.user_data_file, user_data)
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite storage with one row per user subtopic.
+
+    The database runs in WAL mode so readers never block the writer, and a
+    progress update is a single row upsert instead of a whole-file rewrite.
+    Read-modify-write transactions start with BEGIN IMMEDIATE so concurrent
+    writers queue on the write lock instead of failing to upgrade.
+    """
+
+    PROFILE_FIELDS = ("career_path", "course_type", "profile_summary")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'student'
+        );
+        CREATE TABLE IF NOT EXISTS profiles (
+            username TEXT PRIMARY KEY,
+            career_path TEXT,
+            course_type TEXT,
+            profile_summary TEXT,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS progress (
+            username TEXT NOT NULL,
+            progress_key TEXT NOT NULL,
+            track TEXT NOT NULL DEFAULT '',
+            phase TEXT NOT NULL DEFAULT '',
+            topic TEXT NOT NULL DEFAULT '',
+            subtopic TEXT NOT NULL DEFAULT '',
+            completion INTEGER NOT NULL DEFAULT 0,
+            deadlines TEXT,
+            link TEXT,
+            editing INTEGER,
+            timestamp TEXT,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, progress_key)
+        );
+        CREATE TABLE IF NOT EXISTS rollups (
+            username TEXT NOT NULL,
+            track TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, track, phase, topic)
+        );
+        CREATE INDEX IF NOT EXISTS idx_progress_path
+            ON progress (username, track, phase, topic, subtopic);
+        CREATE INDEX IF NOT EXISTS idx_profiles_career
+            ON profiles (career_path);
+    """
+
+    def __init__(self, db_path="tracker.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            has_rollups = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'"
+            ).fetchone()
+            conn.executescript(self.SCHEMA)
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(progress)")]
+            if "version" not in columns:
+                conn.execute("ALTER TABLE progress ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            if not has_rollups:
+                self._rebuild_rollups(conn)
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Run a read-modify-write on this thread's connection holding the write lock"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def get_user(self, username):
+        row = self._connect().execute(
+            "SELECT password, role FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save_user(self, username, hashed_password, role):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO users (username, password, role) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET password = excluded.password, role = excluded.role",
+                (username, hashed_password, role)
+            )
+
+    def register_user(self, username, hashed_password, role):
+        with self._connect() as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
+                (username, hashed_password, role)
+            ).rowcount
+            if inserted:
+                conn.execute("INSERT OR IGNORE INTO profiles (username) VALUES (?)", (username,))
+        return bool(inserted)
+
+    def initialize_user(self, username):
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO profiles (username) VALUES (?)", (username,))
+
+    def _profile_from_row(self, row):
+        record = json.loads(row["extra"] or "{}")
+        for field in self.PROFILE_FIELDS:
+            if row[field] is not None or field == "career_path":
+                record[field] = row[field]
+        record["progress"] = {}
+        return record
+
+    def _entry_from_row(self, row):
+        entry = {"completion": row["completion"]}
+        if row["deadlines"] is not None:
+            entry["deadlines"] = json.loads(row["deadlines"])
+        if row["link"] is not None:
+            entry["link"] = row["link"]
+        if row["editing"] is not None:
+            entry["editing"] = bool(row["editing"])
+        if row["timestamp"] is not None:
+            entry["timestamp"] = row["timestamp"]
+        if row["version"]:
+            entry["version"] = row["version"]
+        return entry
+
+    def get_user_record(self, username):
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM profiles WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        record = self._profile_from_row(row)
+        for entry_row in conn.execute("SELECT * FROM progress WHERE username = ?", (username,)):
+            record["progress"][entry_row["progress_key"]] = self._entry_from_row(entry_row)
+        return record
+
+    def get_all_user_records(self):
+        conn = self._connect()
+        user_data = {row["username"]: self._profile_from_row(row)
+                     for row in conn.execute("SELECT * FROM profiles")}
+        for row in conn.execute("SELECT * FROM progress"):
+            record = user_data.setdefault(row["username"], {"career_path": None, "progress": {}})
+            record["progress"][row["progress_key"]] = self._entry_from_row(row)
+        return user_data
+
+    def iter_user_records(self, usernames=None, chunk_size=500):
+        # Only one chunk of profiles and progress rows is held at a time
+        conn = self._connect()
+        if usernames is None:
+            usernames = [row["username"] for row in conn.execute("SELECT username FROM profiles ORDER BY rowid")]
+        for start in range(0, len(usernames), chunk_size):
+            chunk = list(usernames[start:start + chunk_size])
+            placeholders = ", ".join("?" * len(chunk))
+            records = {row["username"]: self._profile_from_row(row) for row in conn.execute(
+                f"SELECT * FROM profiles WHERE username IN ({placeholders})", chunk
+            )}
+            for row in conn.execute(f"SELECT * FROM progress WHERE username IN ({placeholders})", chunk):
+                records.setdefault(row["username"], {"career_path": None, "progress": {}})
+                records[row["username"]]["progress"][row["progress_key"]] = self._entry_from_row(row)
+            yield {username: records[username] for username in chunk if username in records}
+
+    def _profile_params(self, username, record):
+        extra = {k: v for k, v in record.items() if k not in self.PROFILE_FIELDS and k not in ("progress", "rollups")}
+        return (username, *(record.get(field) for field in self.PROFILE_FIELDS), json.dumps(extra))
+
+    def _entry_params(self, username, key, parts, entry):
+        deadlines = entry.get("deadlines")
+        editing = entry.get("editing")
+        return (
+            username, key, *(part or "" for part in parts),
+            entry.get("completion", 0),
+            json.dumps(deadlines) if deadlines is not None else None,
+            entry.get("link"),
+            int(editing) if editing is not None else None,
+            entry.get("timestamp"),
+            entry.get("version") or 0
+        )
+
+    _UPSERT_PROFILE = (
+        "INSERT INTO profiles (username, career_path, course_type, profile_summary, extra) "
+        "VALUES (?, ?, ?, ?, ?) ON CONFLICT(username) DO UPDATE SET "
+        "career_path = excluded.career_path, course_type = excluded.course_type, "
+        "profile_summary = excluded.profile_summary, extra = excluded.extra"
+    )
+
+    _UPSERT_PROGRESS = (
+        "INSERT INTO progress (username, progress_key, track, phase, topic, subtopic, "
+        "completion, deadlines, link, editing, timestamp, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(username, progress_key) DO UPDATE SET "
+        "track = excluded.track, phase = excluded.phase, topic = excluded.topic, "
+        "subtopic = excluded.subtopic, completion = excluded.completion, "
+        "deadlines = excluded.deadlines, link = excluded.link, editing = excluded.editing, "
+        "timestamp = excluded.timestamp, version = excluded.version"
+    )
+
+    def _rebuild_rollups(self, conn, usernames=None):
+        """Recompute rollups from the progress table inside the caller's transaction"""
+        select = (
+            "INSERT INTO rollups (username, track, phase, topic, total, count) "
+            "SELECT username, track, phase, topic, SUM(completion), COUNT(*) FROM progress "
+            "WHERE track != '' AND phase != '' AND topic != ''"
+        )
+        if usernames is None:
+            conn.execute("DELETE FROM rollups")
+            conn.execute(select + " GROUP BY username, track, phase, topic")
+            return
+        for username in usernames:
+            conn.execute("DELETE FROM rollups WHERE username = ?", (username,))
+            conn.execute(select + " AND username = ? GROUP BY username, track, phase, topic", (username,))
+
+    def update_user_fields(self, username, fields):
+        with self._write_transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO profiles (username) VALUES (?)", (username,))
+            row = conn.execute("SELECT * FROM profiles WHERE username = ?", (username,)).fetchone()
+            record = self._profile_from_row(row)
+            record.update(fields)
+            conn.execute(self._UPSERT_PROFILE, self._profile_params(username, record))
+
+    def save_progress_entries(self, username, items):
+        with self._write_transaction() as conn:
+            versions = self._write_entries(conn, username, items)
+
+        # Callers keep editing their copies, so hand them the stored versions
+        for key, _, entry in items:
+            entry["version"] = versions[key]
+
+    def save_progress_batches(self, batches):
+        # Every user's rows in one transaction, so one fsync covers the batch
+        conflicts, stored_versions = {}, {}
+        with self._write_transaction() as conn:
+            for username, items in batches.items():
+                try:
+                    stored_versions[username] = self._write_entries(conn, username, items)
+                except ConcurrentUpdateError as e:
+                    conflicts[username] = e.keys
+
+        for username, versions in stored_versions.items():
+            for key, _, entry in batches[username]:
+                entry["version"] = versions[key]
+        return conflicts
+
+    def _write_entries(self, conn, username, items):
+        """Check versions and upsert one user's items inside an open transaction; return the new versions"""
+        old_rows = {}
+        for key, _, _ in items:
+            old_rows[key] = conn.execute(
+                "SELECT completion, version FROM progress WHERE username = ? AND progress_key = ?",
+                (username, key)
+            ).fetchone()
+        versions = check_versions(username, items, {
+            key: row["version"] for key, row in old_rows.items() if row is not None
+        })
+
+        conn.execute(
+            "INSERT OR IGNORE INTO profiles (username, career_path) VALUES (?, ?)",
+            (username, items[0][1][0] or None)
+        )
+        for key, parts, entry in items:
+            old_row = old_rows[key]
+            conn.execute(self._UPSERT_PROGRESS,
+                         self._entry_params(username, key, parts, {**entry, "version": versions[key]}))
+            track, phase, topic, _ = parts
+            if track and phase and topic:
+                new_value = entry.get("completion", 0)
+                conn.execute(
+                    "INSERT INTO rollups (username, track, phase, topic, total, count) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(username, track, phase, topic) DO UPDATE SET "
+                    "total = total + excluded.total, count = count + excluded.count",
+                    (username, track, phase, topic,
+                     new_value - old_row["completion"] if old_row else new_value,
+                     0 if old_row else 1)
+                )
+        return versions
+
+    def save_user_records(self, user_data, key_index):
+        profile_rows = []
+        progress_rows = []
+        for username, record in user_data.items():
+            profile_rows.append(self._profile_params(username, record))
+            for key, entry in record.get("progress", {}).items():
+                parts = key_index.get(key, ("", "", "", key))
+                progress_rows.append(self._entry_params(username, key, parts, entry))
+        with self._connect() as conn:
+            conn.executemany(self._UPSERT_PROFILE, profile_rows)
+            conn.executemany(self._UPSERT_PROGRESS, progress_rows)
+            self._rebuild_rollups(conn, list(user_data))
+
+    def import_records(self, accounts, profiles, progress):
+        with self._write_transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
+                [(username, account["password"], account.get("role", "student")) for username, account in accounts.items()]
+            )
+            conn.executemany("INSERT OR IGNORE INTO profiles (username) VALUES (?)",
+                             [(username,) for username in {*accounts, *profiles, *progress}])
+            for username, fields in profiles.items():
+                row = conn.execute("SELECT * FROM profiles WHERE username = ?", (username,)).fetchone()
+                record = self._profile_from_row(row)
+                record.update(fields)
+                conn.execute(self._UPSERT_PROFILE, self._profile_params(username, record))
+
+            progress_rows = []
+            for username, items in progress.items():
+                stored = dict(conn.execute(
+                    "SELECT progress_key, version FROM progress WHERE username = ?", (username,)
+                ).fetchall())
+                versions = check_versions(username, items, stored)
+                progress_rows.extend(
+                    self._entry_params(username, key, parts, {**entry, "version": versions[key]})
+                    for key, parts, entry in items
+                )
+            conn.executemany(self._UPSERT_PROGRESS, progress_rows)
+            self._rebuild_rollups(conn, list(progress))
+
+    def get_rollups(self, usernames=None, records=None):
+        # Rollups live in their own table, so loaded records do not help here
+        conn = self._connect()
+        usernames = list(usernames) if usernames is not None else [
+            row["username"] for row in conn.execute("SELECT username FROM profiles")
+        ]
+        rollups = {username: UserRollup() for username in usernames}
+        for start in range(0, len(usernames), 500):
+            chunk = usernames[start:start + 500]
+            rows = conn.execute(
+                f"SELECT * FROM rollups WHERE username IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for row in rows:
+                rollups[row["username"]].topics[(row["track"], row["phase"], row["topic"])] = [row["total"], row["count"]]
+        return rollups
+
+    # Mean of the phase averages on the student's own track, as in UserRollup.overall_average
+    _COMPLETION_SQL = (
+        "(SELECT AVG(phase_average) FROM (SELECT SUM(total) * 1.0 / SUM(count) AS phase_average "
+        "FROM rollups r WHERE r.username = p.username AND r.track = p.career_path "
+        "GROUP BY r.phase HAVING SUM(count) > 0))"
+    )
+    _LAST_ACTIVITY_SQL = "(SELECT MAX(timestamp) FROM progress g WHERE g.username = p.username)"
+
+    def query_students(self, query, key_index):
+        # Unfiltered pages walk the profiles index; the per-student subqueries use the
+        # (username, ...) primary keys, so cost follows the page, not the cohort
+        columns = (
+            f"p.username, p.career_path, p.course_type, {self._COMPLETION_SQL} AS completion, "
+            f"{self._LAST_ACTIVITY_SQL} AS last_activity"
+        )
+        where = ["p.career_path IS NOT NULL"]
+        params = []
+        if query.career_path:
+            where.append("p.career_path = ?")
+            params.append(query.career_path)
+        if query.name_prefix:
+            escaped = query.name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("p.username LIKE ? ESCAPE '\\'")
+            params.append(escaped + "%")
+        if query.min_completion is not None:
+            where.append(f"COALESCE({self._COMPLETION_SQL}, 0) >= ?")
+            params.append(query.min_completion)
+        if query.max_completion is not None:
+            where.append(f"COALESCE({self._COMPLETION_SQL}, 0) <= ?")
+            params.append(query.max_completion)
+        if query.active_since:
+            where.append(f"{self._LAST_ACTIVITY_SQL} >= ?")
+            params.append(query.active_since)
+        where_sql = " AND ".join(where)
+
+        direction = "DESC" if query.descending else "ASC"
+        if query.order_by == "username":
+            order_sql = f"p.username {direction}"
+        else:
+            order_sql = f"{query.order_by} IS NULL, {query.order_by} {direction}, p.username"
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM profiles p WHERE {where_sql}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {columns} FROM profiles p WHERE {where_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?",
+            [*params, query.page_size, query.offset]
+        )
+        return StudentPage([dict(row) for row in rows], total, query)
+
+    def save_rollups(self, rollups):
+        with self._connect() as conn:
+            for username, rollup in rollups.items():
+                conn.execute("DELETE FROM rollups WHERE username = ?", (username,))
+                conn.executemany(
+                    "INSERT INTO rollups (username, track, phase, topic, total, count) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(username, *topic_key, total, count) for topic_key, (total, count) in rollup.topics.items()]
+                )
+
+
+def create_backend(kind=None):
+    """Create the storage backend selected by TRACKER_STORAGE (json, eventlog or sqlite)"""
+    kind = kind or os.environ.get("TRACKER_STORAGE", "json")
+    if kind == "sqlite":
+        return SQLiteBackend(os.environ.get("TRACKER_DB_PATH", "tracker.db"))
+    if kind == "json":
+        return JSONBackend()
+    if kind == "eventlog":
+        from event_log import EventLogBackend
+        return EventLogBackend()
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def migrate_json_to_sqlite(db_path="tracker.db", users_file="users.json",
+                           user_data_file="user_data.json", progress_file="progress.json",
+                           topics_file="topics.json"):
+    """Copy users, profiles and progress from the JSON files into SQLite.
+
+    Entries from user_data.json win over copies of the same subtopic in a
+    legacy nested progress.json, if one is still present. Returns the number of progress rows written.
+    """
+    backend = SQLiteBackend(db_path)
+    key_index = build_key_index(load_json(topics_file))
+
+    with backend._connect() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO users (username, password, role) VALUES (?, ?, ?)",
+            [(username, user["password"], user.get("role", "student"))
+             for username, user in load_json(users_file).items()]
+        )
+
+    user_data = load_json(user_data_file)
+    backend.save_user_records(user_data, key_index)
+    row_count = sum(len(record.get("progress", {})) for record in user_data.values())
+
+    nested_rows = []
+    for username, tracks in load_json(progress_file).items():
+        for track, topics in tracks.items():
+            for topic, subtopics in topics.items():
+                for subtopic, data in subtopics.items():
+                    key = progress_key(track, None, topic, subtopic)
+                    entry = {"completion": data.get("progress", 0), "timestamp": data.get("timestamp")}
+                    nested_rows.append(backend._entry_params(username, key, (track, "", topic, subtopic), entry))
+    with backend._connect() as conn:
+        conn.executemany("INSERT OR IGNORE INTO profiles (username) VALUES (?)",
+                         [(row[0],) for row in nested_rows])
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO progress (username, progress_key, track, phase, topic, subtopic, "
+            "completion, deadlines, link, editing, timestamp, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            nested_rows
+        )
+        row_count += conn.total_changes - before
+
+    return row_count
+
+
+def _open_stress_backend(kind, directory):
+    if kind == "sqlite":
+        return SQLiteBackend(os.path.join(directory, "tracker.db"))
+    files = [os.path.join(directory, name) for name in ("users.json", "progress.json", "user_data.json")]
+    if kind == "eventlog":
+        from event_log import EventLogBackend
+        return EventLogBackend(*files, os.path.join(directory, "progress_events.jsonl"),
+                               os.path.join(directory, "progress_history.jsonl"), compact_every=50)
+    return JSONBackend(*files)
+
+
+def _stress_writer(kind, directory, writer, updates):
+    """Write distinct entries for one user and bump a shared counter with compare-and-swap"""
+    backend = _open_stress_backend(kind, directory)
+    parts = ("Stress", "Phase", "Topic", "counter")
+    counter_key = progress_key(*parts)
+    for i in range(updates):
+        subtopic = f"w{writer}_{i}"
+        backend.save_progress_entry("stress", progress_key("Stress", "Phase", "Topic", subtopic),
+                                    ("Stress", "Phase", "Topic", subtopic), {"completion": 1})
+        while True:
+            record = backend.get_user_record("counter") or {}
+            entry = record.get("progress", {}).get(counter_key, {"completion": 0})
+            entry = {**entry, "completion": entry["completion"] + 1, "version": entry.get("version", 0)}
+            try:
+                backend.save_progress_entry("counter", counter_key, parts, entry)
+                break
+            except ConcurrentUpdateError:
+                continue
+
+
+def stress_test(kind="json", writers=8, updates=25, directory=None):
+    """Run concurrent writer processes against a store in directory (default a scratch one).
+
+    Returns (expected, stored entries, counter value, rollup count); all
+    four match when the backend is safe for multiple writers.
+    """
+    if directory is None:
+        with tempfile.TemporaryDirectory() as scratch:
+            return stress_test(kind, writers, updates, scratch)
+    _open_stress_backend(kind, directory)
+    processes = [
+        multiprocessing.Process(target=_stress_writer, args=(kind, directory, writer, updates))
+        for writer in range(writers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    backend = _open_stress_backend(kind, directory)
+    entries = (backend.get_user_record("stress") or {}).get("progress", {})
+    counter = (backend.get_user_record("counter") or {}).get("progress", {})
+    rollup = backend.get_rollups(["stress"])["stress"]
+    return (
+        writers * updates,
+        len(entries),
+        counter.get(progress_key("Stress", "Phase", "Topic", "counter"), {}).get("completion", 0),
+        rollup.topic_totals("Stress", "Phase", "Topic")[1] if rollup else 0
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Progress Tracker storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Migrate the JSON files into SQLite")
+    migrate_parser.add_argument("--db", default="tracker.db", help="Target SQLite database")
+    stress_parser = subparsers.add_parser("stress", help="Check concurrent writers against a scratch store")
+    stress_parser.add_argument("--backend", choices=["json", "eventlog", "sqlite"], default="json")
+    stress_parser.add_argument("--writers", type=int, default=8, help="Concurrent writer processes")
+    stress_parser.add_argument("--updates", type=int, default=25, help="Updates per writer")
+    convert_parser = subparsers.add_parser("convert", help="Rewrite the JSON store files in another format")
+    convert_parser.add_argument("--to", choices=serializers.FORMATS, required=True, dest="fmt")
+    convert_parser.add_argument("files", nargs="*", default=["users.json", "user_data.json", "deadlines.json"],
+                                help="Files to convert (default: the JSON backend's stores)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        rows = migrate_json_to_sqlite(args.db)
+        print(f"Migrated {rows} progress rows into {args.db}")
+    elif args.command == "stress":
+        expected, entries, counter, rollup_count = stress_test(args.backend, args.writers, args.updates)
+        print(f"Expected {expected} updates: {entries} entries, counter {counter}, rollup count {rollup_count}")
+        if not expected == entries == counter == rollup_count:
+            raise SystemExit("Lost updates detected")
+    elif args.command == "convert":
+        for file_path in args.files:
+            if not os.path.exists(file_path):
+                continue
+            start = time.perf_counter()
+            before, after = convert_file(file_path, args.fmt)
+            print(f"{file_path}: {before} -> {after} bytes as {args.fmt} "
+                  f"({(time.perf_counter() - start) * 1000:.0f} ms)")
@@ -0,0 +1,96 @@
+import math
+
+ORDERINGS = ("username", "completion", "last_activity")
+
+
+class StudentQuery:
+    """Filters, ordering and page for an admin student list.
+
+    Only students with a career path are listed. Completion is the mean of
+    the student's phase averages on their own track (as in the Class
+    Summary), counting students without progress as 0. active_since is an
+    ISO date or datetime string compared with entry timestamps.
+    """
+
+    def __init__(self, career_path=None, name_prefix=None, min_completion=None, max_completion=None,
+                 active_since=None, order_by="username", descending=False, page=0, page_size=25):
+        if order_by not in ORDERINGS:
+            raise ValueError(f"Unknown student ordering: {order_by}")
+        self.career_path = career_path
+        self.name_prefix = name_prefix or None
+        self.min_completion = min_completion
+        self.max_completion = max_completion
+        self.active_since = str(active_since) if active_since else None
+        self.order_by = order_by
+        self.descending = descending
+        self.page = max(page, 0)
+        self.page_size = max(page_size, 1)
+
+    @property
+    def offset(self):
+        return self.page * self.page_size
+
+    def matches(self, username, career_path, completion, last_activity):
+        """Return True if one student summary passes every filter"""
+        if career_path is None or (self.career_path and career_path != self.career_path):
+            return False
+        if self.name_prefix and not username.lower().startswith(self.name_prefix.lower()):
+            return False
+        if self.min_completion is not None and (completion or 0) < self.min_completion:
+            return False
+        if self.max_completion is not None and (completion or 0) > self.max_completion:
+            return False
+        if self.active_since and (last_activity or "") < self.active_since:
+            return False
+        return True
+
+
+class StudentPage:
+    """One page of student summaries plus the total number of matches.
+
+    Each row is {"username", "career_path", "course_type", "completion",
+    "last_activity"}; completion is None for students without progress.
+    """
+
+    def __init__(self, rows, total, query):
+        self.rows = rows
+        self.total = total
+        self.page = query.page
+        self.page_size = query.page_size
+
+    @property
+    def pages(self):
+        return max(math.ceil(self.total / self.page_size), 1)
+
+    @property
+    def usernames(self):
+        return [row["username"] for row in self.rows]
+
+
+def filter_students(user_data, rollups, query):
+    """Apply a StudentQuery to in-memory records and {username: UserRollup}; return a StudentPage"""
+    matches = []
+    for username, record in user_data.items():
+        career_path = record.get("career_path")
+        rollup = rollups.get(username)
+        completion = rollup.overall_average(career_path) if rollup is not None and career_path else None
+        timestamps = [entry.get("timestamp") for entry in record.get("progress", {}).values() if entry.get("timestamp")]
+        last_activity = max(timestamps) if timestamps else None
+        if query.matches(username, career_path, completion, last_activity):
+            matches.append({
+                "username": username,
+                "career_path": career_path,
+                "course_type": record.get("course_type"),
+                "completion": completion,
+                "last_activity": last_activity
+            })
+
+    if query.order_by == "username":
+        matches.sort(key=lambda row: row["username"], reverse=query.descending)
+    else:
+        # Missing values sort last in either direction
+        present = [row for row in matches if row[query.order_by] is not None]
+        missing = [row for row in matches if row[query.order_by] is None]
+        present.sort(key=lambda row: (row[query.order_by], row["username"]), reverse=query.descending)
+        matches = present + sorted(missing, key=lambda row: row["username"])
+    return StudentPage(matches[query.offset:query.offset + query.page_size], len(matches), query)
@@ -0,0 +1,293 @@
+
+import streamlit as st
+
+from deadlines import latest_deadline
+from perf import timed
+from visualization import (create_overall_bar_chart, create_overall_gauge_chart, create_phase_bar_chart,
+                           create_phase_pie_chart, create_topic_chart)
+
+
+@timed("render.topic")
+def render_topic(curriculum, current_track, phase_name, topic_name, user_data, viewing_user,
+                 is_viewing_other, changes, manager, batch=False):
+    """Render the sliders, deadlines and chart for one topic; return {subtopic: completion}"""
+    topic_progress = {}
+
+    # Batch mode groups the topic into one form so edits only rerun on submit
+    container = st.form(key=f"form_{viewing_user}_{phase_name}_{topic_name}") if batch else st.container()
+    pending = {}
+    submitted = False
+
+    with container:
+        for subtopic_id in curriculum.topic_range(current_track, phase_name, topic_name):
+            # Precompiled name and unique key for this subtopic
+            subtopic = curriculum.parts_for_id(subtopic_id)[3]
+            subtopic_key = curriculum.key_for_id(subtopic_id)
+
+            # Get existing data for this subtopic
+            if "progress" not in user_data[viewing_user]:
+                user_data[viewing_user]["progress"] = {}
+
+            stored = subtopic_key in user_data[viewing_user]["progress"]
+            subtopic_data = user_data[viewing_user]["progress"].get(subtopic_key, {"completion": 0, "deadlines": []})
+
+            # Initialize columns
+            col1, col2, col3 = st.columns([3, 1, 2])
+
+            with col1:
+                label = f"{subtopic}"
+                st.markdown(f"**{label}**")
+                # Add document link input if in Documents section
+                if "Portfolio" in topic_name:
+                    # Create columns for link input/display and edit button
+                    link_col1, link_col2 = st.columns([4, 1])
+
+                    # Initialize progress data if not exists
+                    if subtopic_key not in user_data[viewing_user]["progress"]:
+                        user_data[viewing_user]["progress"][subtopic_key] = {
+                            "completion": 0,
+                            "deadlines": [],
+                            "link": "",
+                            "editing": False
+                        }
+
+                    # Get current link and editing state
+                    progress_data = user_data[viewing_user]["progress"][subtopic_key]
+                    current_link = progress_data.get("link", "")
+
+
+                    # Initialize editing state if not exists
+                    if "editing" not in progress_data:
+                        progress_data["editing"] = False
+
+                    if batch:
+                        # Forms cannot hold plain buttons, so the link is saved with the topic
+                        new_link = st.text_input(
+                            "Document Link",
+                            value=current_link,
+                            key=f"batch_link_{viewing_user}_{subtopic_key}",
+                            placeholder="Enter document URL",
+                            disabled=is_viewing_other
+                        )
+                        if not is_viewing_other:
+                            pending.setdefault(subtopic_key, {}).update(link=new_link, editing=False)
+                    elif current_link and not progress_data["editing"]:
+                        # Display current link as clickable
+                        st.markdown(f"[{subtopic}]({current_link})")
+                    else:
+                        # Initialize session state for this link
+                        link_key = f"link_{viewing_user}_{subtopic_key}"
+                        if link_key not in st.session_state:
+                            st.session_state[link_key] = current_link or ""
+
+                        # Show input field when editing
+                        new_link = st.text_input(
+                            "Document Link",
+                            value=st.session_state[link_key],
+                            key=link_key,
+                            placeholder="Enter document URL",
+                            disabled=is_viewing_other
+                        )
+
+                        # Save button to confirm changes
+                        if st.button("Save Link", key=f"save_{subtopic_key}", disabled=is_viewing_other):
+                            changes.update_progress(user_data, viewing_user, subtopic_key,
+                                                    link=new_link, editing=False)
+                            manager.save_changes(user_data, changes)
+                            st.rerun()
+
+                    with link_col2:
+                        if not is_viewing_other and not batch:
+                            if current_link and not progress_data["editing"]:
+                                if st.button("📝 Edit", key=f"edit_{subtopic_key}"):
+                                    changes.update_progress(user_data, viewing_user, subtopic_key,
+                                                            editing=True)
+                                    manager.save_changes(user_data, changes)
+                                    st.rerun()
+
+            with col2:
+                percentage = st.slider("", 0, 100, subtopic_data.get("completion", 0), 
+                                     key=f"{viewing_user}_{subtopic_key}",
+                                     disabled=is_viewing_other)
+                topic_progress[subtopic] = percentage
+
+            # Deadline Handling
+            with col3:
+                prev_dates = list(subtopic_data.get("deadlines", []))
+
+                # Date input (disabled for admin viewing other users)
+                latest_date = latest_deadline(subtopic_data)
+
+                current_date = st.date_input("Deadline", 
+                                          value=latest_date, 
+                                          key=f"date_{viewing_user}_{subtopic_key}",
+                                          disabled=is_viewing_other)
+
+                # Update dates if we have a new one and user has permission
+                if current_date and not is_viewing_other:
+                    current_date_str = str(current_date)
+                    # Only add the date if it's different from the last one
+                    if not prev_dates or prev_dates[-1] != current_date_str:
+                        prev_dates.append(current_date_str)
+                        # Don't sort dates - we want to preserve the history in order of entry
+
+                    # Update progress data, marking it dirty only if it changed
+                    pending.setdefault(subtopic_key, {}).update(completion=percentage, deadlines=prev_dates)
+                elif batch and not is_viewing_other:
+                    # An explicit batch submit also saves sliders without a deadline
+                    pending.setdefault(subtopic_key, {}).update(completion=percentage)
+
+                # A submit must not store untouched subtopics as 0% entries, which would lower stored averages
+                if batch and not stored and not any(pending.get(subtopic_key, {}).get(name)
+                                                    for name in ("completion", "deadlines", "link")):
+                    pending.pop(subtopic_key, None)
+
+                # Format and display deadline history
+                if prev_dates:
+                    st.markdown("##### Deadline History:")
+                    timeline_html = ""
+
+                    for i, date in enumerate(prev_dates):
+                        # Format: older dates small and strikethrough, latest date bold
+                        if i < len(prev_dates) - 1:
+                            # Older dates (small and strikethrough)
+                            size = max(70 - (len(prev_dates) - i - 1) * 5, 50)  # Size decreases with age
+                            timeline_html += f"<span style='text-decoration:line-through;font-size:{size}%;color:gray;'>{date}</span> → "
+                        else:
+                            # Latest date (bold and larger)
+                            timeline_html += f"<span style='font-weight:bold;font-size:110%;color:#1f77b4;'>{date}</span>"
+
+                    st.markdown(timeline_html, unsafe_allow_html=True)
+
+        if batch:
+            submitted = st.form_submit_button("💾 Save topic", disabled=is_viewing_other)
+
+    if not batch or submitted:
+        # Record this run's edits; a batch submit is written as one bulk save
+        for subtopic_key, values in pending.items():
+            changes.update_progress(user_data, viewing_user, subtopic_key, **values)
+        if submitted:
+            manager.save_changes(user_data, changes)
+
+    # Topic progress visualization
+    if topic_progress:
+        st.markdown("#### Topic Progress")
+        st.plotly_chart(create_topic_chart(topic_name, topic_progress), use_container_width=True)
+
+    return topic_progress
+
+
+def render_phase_summary(phase_name, phase_progress):
+    """Render the bar and pie charts for one phase's topic averages"""
+    st.markdown(f"### {phase_name} Phase Summary")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(create_phase_bar_chart(phase_name, phase_progress), use_container_width=True)
+
+    with col2:
+        st.plotly_chart(create_phase_pie_chart(phase_name, phase_progress), use_container_width=True)
+
+
+def render_overall_summary(current_track, overall_progress):
+    """Render the overall bar and gauge charts from per-phase averages"""
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(create_overall_bar_chart(current_track, overall_progress), use_container_width=True)
+
+    with col2:
+        # Calculate average overall progress
+        total_completion = sum(overall_progress.values()) / len(overall_progress)
+        st.plotly_chart(create_overall_gauge_chart(total_completion), use_container_width=True)
+
+
+@timed("render.tabbed_dashboard")
+def render_tabbed_dashboard(curriculum, current_track, user_data, viewing_user, is_viewing_other, changes, manager,
+                            batch=False):
+    """Render every phase and topic inside tabs; return {phase: average completion}"""
+    topics_data = curriculum.get_topics(current_track)
+
+    # Create tabs for each phase
+    phase_tabs = st.tabs(list(topics_data.keys()))
+
+    # Track overall progress data for final summary
+    overall_progress = {}
+
+    # Process each phase in its own tab
+    for tab_idx, phase_name in enumerate(topics_data.keys()):
+        with phase_tabs[tab_idx]:
+            st.markdown(f"### Phase: {phase_name}")
+
+            # Initialize phase progress tracking
+            phase_progress = {}
+            topics = topics_data[phase_name]
+
+            # Create a subtab for each topic in this phase
+            topic_tabs = st.tabs(list(topics.keys()))
+
+            for topic_idx, topic_name in enumerate(topics.keys()):
+                with topic_tabs[topic_idx]:
+                    topic_progress = render_topic(curriculum, current_track, phase_name, topic_name, user_data,
+                                                  viewing_user, is_viewing_other, changes, manager, batch)
+                    if topic_progress:
+                        # Add to phase progress
+                        phase_progress[topic_name] = sum(topic_progress.values()) / len(topic_progress)
+
+            # Phase progress visualization after all topics are processed
+            if phase_progress:
+                render_phase_summary(phase_name, phase_progress)
+
+                # Store overall progress for this phase
+                overall_progress[phase_name] = sum(phase_progress.values()) / len(phase_progress)
+
+    return overall_progress
+
+
+def stored_topic_averages(curriculum, current_track, rollup):
+    """Return {phase: {topic: average}} from a UserRollup, counting missing subtopics as 0%"""
+    averages = {}
+    for phase_name, topics in curriculum.get_topics(current_track).items():
+        averages[phase_name] = {
+            topic_name: rollup.topic_totals(current_track, phase_name, topic_name)[0] / len(subtopics)
+            for topic_name, subtopics in topics.items() if subtopics
+        }
+    return averages
+
+
+@timed("render.lazy_dashboard")
+def render_lazy_dashboard(curriculum, current_track, user_data, viewing_user, is_viewing_other, changes,
+                          manager, rollup, batch=False):
+    """Render only the selected phase and topic; return {phase: average completion}.
+
+    Streamlit executes every tab body on every rerun, so the tabbed layout
+    rebuilds widgets and charts for the whole curriculum. Here the other
+    phases and topics are summarized from the stored rollup instead.
+    """
+    topic_averages = stored_topic_averages(curriculum, current_track, rollup)
+    phase_averages = {
+        phase_name: sum(topics.values()) / len(topics)
+        for phase_name, topics in topic_averages.items() if topics
+    }
+
+    phase_names = [phase_name for phase_name, topics in topic_averages.items() if topics]
+    if not phase_names:
+        return {}
+    # Option labels stay fixed so a save that moves an average keeps the selection; averages go in captions
+    phase_name = st.radio("Phase", phase_names, horizontal=True, key=f"lazy_phase_{viewing_user}")
+    st.caption(" · ".join(f"{name}: {phase_averages[name]:.0f}%" for name in phase_names))
+    topics = topic_averages[phase_name]
+    topic_name = st.radio("Topic", list(topics), horizontal=True, key=f"lazy_topic_{viewing_user}_{phase_name}")
+    st.caption(" · ".join(f"{name}: {average:.0f}%" for name, average in topics.items()))
+
+    st.markdown(f"### Phase: {phase_name}")
+    topic_progress = render_topic(curriculum, current_track, phase_name, topic_name, user_data,
+                                  viewing_user, is_viewing_other, changes, manager, batch)
+    if topic_progress:
+        # The rendered topic shows live slider values rather than stored ones
+        topics[topic_name] = sum(topic_progress.values()) / len(topic_progress)
+        phase_averages[phase_name] = sum(topics.values()) / len(topics)
+
+    render_phase_summary(phase_name, topics)
+    return phase_averages
@@ -0,0 +1,18 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture(params=["json", "sqlite", "eventlog"])
+def store(request, tmp_path, monkeypatch):
+    """Run the test in a scratch directory holding the real curriculum and an empty store"""
+    shutil.copy(os.path.join(APP_DIR, "topics.json"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TRACKER_STORAGE", request.param)
+    monkeypatch.setenv("TRACKER_WRITE_BEHIND", "0")
+    return request.param
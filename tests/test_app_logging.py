@@ -0,0 +1,22 @@
+import json
+
+import app_logging
+
+
+def test_exception_traceback_is_a_separate_field(tmp_path):
+    log_file = tmp_path / "app.log"
+    app_logging.configure_logging("INFO", str(log_file), "json", sample_rates={})
+    try:
+        try:
+            raise ValueError("broken")
+        except ValueError:
+            app_logging.get_logger("test").exception("saving failed", username="alice")
+    finally:
+        # Stopping the listener flushes the queue; then restore the default setup
+        app_logging.shutdown_logging()
+        app_logging.configure_logging()
+
+    line = json.loads(log_file.read_text().splitlines()[-1])
+    assert line["event"] == "saving failed"
+    assert line["username"] == "alice"
+    assert "Traceback" in line["exc"] and "ValueError: broken" in line["exc"]
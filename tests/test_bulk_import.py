@@ -0,0 +1,18 @@
+import pytest
+
+from bulk_import import ImportReport, read_progress
+
+
+@pytest.mark.parametrize("completion", ["inf", "-inf", "nan", "101", "-1", "abc"])
+def test_invalid_completion_is_reported(completion):
+    report = ImportReport()
+    rows = [{"username": "alice", "topic": "Python", "subtopic": "Basics", "completion": completion}]
+    assert read_progress(rows, report) == {}
+    assert [error[:2] for error in report.errors] == [("progress", 2)]
+
+
+def test_fractional_completion_is_truncated():
+    report = ImportReport()
+    rows = [{"username": "alice", "topic": "Python", "subtopic": "Basics", "completion": "42.9"}]
+    history = read_progress(rows, report)
+    assert history["alice"][("", "", "Python", "Basics")] == [(2, None, 42, None)]
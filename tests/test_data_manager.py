@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from data_manager import DataManager
+from write_behind import FlushTimeoutError
+
+
+def _first_subtopic(manager):
+    curriculum = manager.get_curriculum()
+    track = next(iter(curriculum.tracks()))
+    key = curriculum.key_for_id(next(iter(curriculum.track_range(track))))
+    return key, curriculum.parts_for_key(key)
+
+
+def test_save_progress_keeps_deadlines_and_link(store):
+    manager = DataManager()
+    assert manager.register_user("alice", "hash")
+    key, (track, phase, topic, subtopic) = _first_subtopic(manager)
+    assert manager.save_progress_many("alice", {key: {
+        "completion": 10, "deadlines": ["2030-01-01"], "link": "https://example.com/work", "editing": False
+    }})
+    index = manager.get_deadline_index()
+
+    assert manager.save_progress("alice", track, topic, subtopic, 60, phase)
+
+    entry = manager.get_user_record("alice")["progress"][key]
+    assert entry["completion"] == 60
+    assert entry["deadlines"] == ["2030-01-01"]
+    assert entry["link"] == "https://example.com/work"
+    assert entry["editing"] is False
+    # The deadline index still lists the entry, now with the new completion
+    assert index.due_between(None, date(2030, 1, 1)) == [(date(2030, 1, 1), "alice", key, 60)]
+
+
+def test_flush_timeout_raises_instead_of_blocking(store, monkeypatch):
+    monkeypatch.setenv("TRACKER_FLUSH_TIMEOUT", "0.2")
+    manager = DataManager(write_behind=True)
+    key, _ = _first_subtopic(manager)
+
+    def failing(batches):
+        raise OSError("store unavailable")
+
+    manager.writer.backend.save_progress_batches = failing
+    try:
+        assert manager.save_progress_many("alice", {key: {"completion": 10, "deadlines": ["2030-01-01"]}})
+        with pytest.raises(FlushTimeoutError):
+            manager.get_deadline_index()
+        with pytest.raises(FlushTimeoutError):
+            manager.import_records({}, {}, {})
+    finally:
+        # The store recovers and the queued save is committed on close
+        del manager.writer.backend.save_progress_batches
+        manager.writer.close()
+    assert manager.get_user_record("alice")["progress"][key]["completion"] == 10
@@ -0,0 +1,88 @@
+import threading
+from datetime import date
+
+import pytest
+
+from deadlines import DeadlineIndex, shared_index, update_shared
+
+
+def test_saves_do_not_wait_for_a_build_and_are_replayed_onto_it():
+    started, release = threading.Event(), threading.Event()
+
+    def build():
+        started.set()
+        release.wait(5)
+        # Read before the save below, so only the replay can add it
+        return DeadlineIndex.build([{"bob": {"progress": {"b": {"completion": 0, "deadlines": ["2030-01-02"]}}}}])
+
+    result = []
+    builder = threading.Thread(target=lambda: result.append(shared_index("replay-test", build)))
+    builder.start()
+    assert started.wait(5)
+
+    saver = threading.Thread(target=update_shared, args=(
+        "replay-test", "alice", {"a": {"completion": 10, "deadlines": ["2030-01-01"]}}
+    ))
+    saver.start()
+    saver.join(1)
+    assert not saver.is_alive()
+
+    release.set()
+    builder.join(5)
+    assert [row[1:3] for row in result[0].due_between(None, date(2030, 12, 31))] == [("alice", "a"), ("bob", "b")]
+    assert shared_index("replay-test", build) is result[0]
+
+
+def test_update_from_a_thread_during_build_is_in_the_returned_index():
+    def build():
+        saver = threading.Thread(target=update_shared, args=(
+            "thread-test", "alice", {"a": {"completion": 10, "deadlines": ["2030-01-01"]}}
+        ))
+        saver.start()
+        saver.join(5)
+        return DeadlineIndex.build([])
+
+    index = shared_index("thread-test", build)
+    assert [row[1:3] for row in index.due_between(None, date(2030, 12, 31))] == [("alice", "a")]
+
+
+class _HookedLock:
+    """Lock that runs on_release once, outside the lock, after its nth release"""
+
+    def __init__(self, n, on_release):
+        self._lock = threading.Lock()
+        self._releases = 0
+        self._n = n
+        self._on_release = on_release
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        self._releases += 1
+        if self._releases == self._n:
+            self._on_release()
+
+
+def test_update_after_the_build_returns_is_not_lost(monkeypatch):
+    import deadlines
+
+    entry = {"a": {"completion": 10, "deadlines": ["2030-01-01"]}}
+    # Releases 1 and 2 are the freshness check and the start of the build;
+    # the third follows the first lock taken once build() has returned
+    monkeypatch.setattr(deadlines, "_indexes_lock",
+                        _HookedLock(3, lambda: update_shared("gap-test", "alice", entry)))
+    index = shared_index("gap-test", lambda: DeadlineIndex.build([]))
+    assert [row[1:3] for row in index.due_between(None, date(2030, 12, 31))] == [("alice", "a")]
+
+
+def test_failed_build_stops_queueing_updates():
+    import deadlines
+
+    def build():
+        raise RuntimeError("store unavailable")
+
+    with pytest.raises(RuntimeError):
+        shared_index("fail-test", build)
+    assert "fail-test" not in deadlines._pending
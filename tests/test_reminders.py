@@ -0,0 +1,56 @@
+import threading
+from datetime import date, timedelta
+
+from data_manager import DataManager
+from reminders import FakeTransport, run_reminders
+
+
+class _OverlappingTransport(FakeTransport):
+    """Starts a second reminder run from another thread while the first one is sending"""
+
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+        self.overlapping = []
+
+    async def send(self, recipient, body):
+        second = threading.Thread(target=lambda: self.overlapping.append(run_reminders(self.manager, FakeTransport())))
+        second.start()
+        second.join(5)
+        assert not second.is_alive(), "the state file stayed locked while sending"
+        await super().send(recipient, body)
+
+
+class _FailingTransport(FakeTransport):
+    async def send(self, recipient, body):
+        raise OSError("gateway down")
+
+
+def _student_with_deadline(manager):
+    assert manager.register_user("alice", "hash")
+    curriculum = manager.get_curriculum()
+    key = curriculum.key_for_id(next(iter(curriculum.track_range(next(iter(curriculum.tracks()))))))
+    assert manager.save_progress_many("alice", {key: {
+        "completion": 10, "deadlines": [str(date.today() + timedelta(days=1))]
+    }})
+
+
+def test_overlapping_run_does_not_wait_for_sends_or_send_twice(store):
+    manager = DataManager()
+    _student_with_deadline(manager)
+    transport = _OverlappingTransport(manager)
+
+    report = run_reminders(manager, transport)
+    assert report.sent == 1 and len(transport.sent) == 1
+    (overlapping,) = transport.overlapping
+    assert (overlapping.sent, overlapping.skipped) == (0, 1)
+
+
+def test_failed_send_releases_its_claim(store):
+    manager = DataManager()
+    _student_with_deadline(manager)
+
+    failed = run_reminders(manager, _FailingTransport(), attempts=1)
+    assert list(failed.failed) == ["alice"]
+    retry = FakeTransport()
+    assert run_reminders(manager, retry).sent == 1 and len(retry.sent) == 1
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from storage import CachedJSONFile, JSONBackend, save_json, stress_test
+
+
+def test_user_cache_is_shared_between_backends(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = JSONBackend()
+    first.save_user("alice", "hash", "student")
+    second = JSONBackend()
+    assert second._users is first._users
+    assert second.get_user("alice") == {"password": "hash", "role": "student"}
+
+
+def test_record_index_is_shared_and_rollups_use_loaded_records(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = JSONBackend()
+    first.register_user("alice", "hash", "student")
+    assert JSONBackend()._records is first._records
+
+    records = first.get_all_user_records()
+    monkeypatch.setattr(first, "_read_record", lambda username: pytest.fail("record read again"))
+    assert first.get_rollups(["alice"], records)["alice"].topics == {}
+
+
+def test_concurrent_writers_lose_no_updates(store, tmp_path):
+    expected, entries, counter, rollup_count = stress_test(store, writers=4, updates=10, directory=str(tmp_path))
+    assert (entries, counter, rollup_count) == (expected, expected, expected)
+
+
+def test_chunked_records_match_a_full_load_without_loading_everyone(store, monkeypatch):
+    from data_manager import DataManager
+
+    manager = DataManager()
+    for name in ("alice", "bob", "carol"):
+        assert manager.register_user(name, "hash")
+    assert manager.save_progress_many("bob", {"Data Analyst_Phase 2_Python_Basics": {"completion": 40}})
+    expected = manager.get_all_user_data()
+
+    from event_log import EventLogBackend
+    from storage import SQLiteBackend
+    for cls in (JSONBackend, EventLogBackend, SQLiteBackend):
+        monkeypatch.setattr(cls, "get_all_user_records", lambda self: pytest.fail("every record loaded at once"))
+    chunks = list(manager.iter_user_records(chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert {username: record for chunk in chunks for username, record in chunk.items()} == expected
+
+
+def test_cached_file_sees_a_same_size_rewrite_within_one_mtime_tick(tmp_path):
+    path = str(tmp_path / "users.json")
+    save_json(path, {"alice": "a"})
+    cached = CachedJSONFile(path)
+    assert cached.load() == {"alice": "a"}
+    mtime = os.stat(path).st_mtime_ns
+
+    save_json(path, {"alice": "b"})
+    os.utime(path, ns=(mtime, mtime))
+    assert cached.load() == {"alice": "b"}
+
+
+def test_event_log_tail_is_shared_between_backends(tmp_path, monkeypatch):
+    from event_log import EventLogBackend
+
+    monkeypatch.chdir(tmp_path)
+    first = EventLogBackend(compact_interval=0)
+    first.register_user("alice", "hash", "student")
+    first.save_progress_entry("alice", "T_P_Topic_Sub", ("T", "P", "Topic", "Sub"), {"completion": 30})
+    second = EventLogBackend(compact_interval=0)
+    assert second.log is first.log
+    # The second backend picks up from the cached offset instead of re-reading the log
+    assert second.log._offset == first.log._offset > 0
+    assert second.get_user_record("alice")["progress"]["T_P_Topic_Sub"]["completion"] == 30
@@ -0,0 +1,29 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_DIR
+from data_manager import DataManager
+
+
+def test_batch_submit_only_saves_edited_subtopics(store):
+    manager = DataManager()
+    assert manager.register_user("alice", "hash")
+    manager.update_career_path("alice", next(iter(manager.get_curriculum().tracks())))
+
+    at = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=60)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "alice"
+    at.session_state["role"] = "student"
+    at.session_state["current_page"] = "main"
+    at.session_state["batch_edit"] = True
+    at.run()
+    assert not at.exception and len(at.slider) > 1
+
+    at.radio(key="lazy_phase_alice").set_value("Phase 2").run()
+    at.slider[0].set_value(100)
+    next(button for button in at.button if button.label == "💾 Save topic").click().run()
+    assert not at.exception
+
+    progress = DataManager().get_user_record("alice")["progress"]
+    assert [entry["completion"] for entry in progress.values()] == [100]
@@ -0,0 +1,14 @@
+from storage import create_backend
+from write_behind import WriteBehindQueue
+
+
+def test_rebase_map_is_bounded(store):
+    queue = WriteBehindQueue(create_backend(), interval=0.01, max_rebase=5)
+    try:
+        for i in range(20):
+            queue.submit_progress("alice", [(f"key{i}", ("Track", "Phase", "Topic", f"key{i}"), {"completion": i})])
+            assert queue.flush(5)
+        assert list(queue._rebase) == [("alice", f"key{i}") for i in range(15, 20)]
+        assert queue.backend.get_user_record("alice")["progress"]["key19"]["completion"] == 19
+    finally:
+        queue.close()
@@ -1,7 +1,49 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 
+from figure_cache import memoize_figure
+
+# Above this many students, per-student traces switch to aggregated ones whose
+# size depends on the number of phases, topics or bins instead of the cohort
+AGGREGATE_ABOVE = 200
+
+# Points kept when a per-student curve is downsampled
+MAX_CURVE_POINTS = 200
+
+
+def _percentile_box(name, values, color=None):
+    """Return a Box trace drawn from precomputed percentiles rather than raw values.
+
+    The box spans the 25th-75th percentiles and the whiskers the 5th-95th,
+    so the payload is a handful of numbers however many values there are.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    p5, p25, p50, p75, p95 = np.percentile(values, [5, 25, 50, 75, 95])
+    return go.Box(
+        name=str(name), x=[str(name)], q1=[p25], median=[p50], q3=[p75], lowerfence=[p5], upperfence=[p95],
+        mean=[float(values.mean())], boxpoints=False, marker_color=color,
+        hovertemplate=f"{name}<br>n={len(values)}<extra></extra>"
+    )
+
+
+def _percentile_band_chart(groups, title, x_title, y_title):
+    """Return a figure with one percentile box per {name: values} group"""
+    fig = go.Figure()
+    for name, values in groups.items():
+        box = _percentile_box(name, values)
+        if box is not None:
+            fig.add_trace(box)
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, showlegend=False,
+                      yaxis_range=[0, 100], font=dict(size=12))
+    return fig
+
+
+@memoize_figure
 def create_progress_chart(progress_data):
     # Create a list to store the flattened data
     data_list = []
@@ -21,6 +63,13 @@ def create_progress_chart(progress_data):
 
     df = pd.DataFrame(data_list)
 
+    if len(progress_data) > AGGREGATE_ABOVE:
+        # One percentile band per topic instead of a bar per student and subtopic
+        return _percentile_band_chart(
+            {topic: group['Progress'].to_numpy() for topic, group in df.groupby('Topic', sort=False)},
+            f'Student Progress by Topic ({len(progress_data)} students)', "Topics", "Progress (%)"
+        )
+
     fig = px.bar(
         df,
         x='Student',
@@ -42,28 +91,37 @@ def create_progress_chart(progress_data):
 
     return fig
 
-def create_average_progress_chart(progress_data):
-    # Create a list to store the flattened data
-    data_list = []
-
-    for student, topics in progress_data.items():
-        student_total = 0
-        subtopic_count = 0
-        for topic, subtopics in topics.items():
-            for subtopic, data in subtopics.items():
-                student_total += data['progress']
-                subtopic_count += 1
-        if subtopic_count > 0:
-            data_list.append({
-                'Student': student,
-                'Average': student_total / subtopic_count
-            })
+@memoize_figure
+def create_average_progress_chart(progress_matrix):
+    # Per-student means come from a ProgressMatrix or precomputed RollupMatrix
+    averages = progress_matrix.student_averages()
+    data_list = [
+        {'Student': student, 'Average': average}
+        for student, average in zip(progress_matrix.students, averages)
+        if not np.isnan(average)
+    ]
 
     if not data_list:
         return go.Figure()
 
     df = pd.DataFrame(data_list)
 
+    if len(df) > AGGREGATE_ABOVE:
+        # Downsample to a sorted percentile curve drawn with WebGL
+        ranks = np.linspace(0, 100, MAX_CURVE_POINTS)
+        fig = go.Figure(go.Scattergl(
+            x=ranks, y=np.percentile(df['Average'].to_numpy(), ranks), mode='lines', line=dict(width=3),
+            hovertemplate="%{x:.0f}% of students are at or below %{y:.1f}%<extra></extra>"
+        ))
+        fig.update_layout(
+            title=f'Average Student Progress ({len(df)} students)',
+            showlegend=False,
+            xaxis_title="Students (percentile)",
+            yaxis_title="Average Progress (%)",
+            font=dict(size=12)
+        )
+        return fig
+
     fig = px.line(
         df,
         x='Student',
@@ -85,4 +143,168 @@ def create_average_progress_chart(progress_data):
         font=dict(size=12)
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+@memoize_figure
+def create_topic_chart(topic_name, topic_progress):
+    # Create DataFrame for better visualization
+    topic_df = pd.DataFrame({
+        'Subtopic': list(topic_progress.keys()),
+        'Completion': list(topic_progress.values())
+    })
+
+    fig = px.bar(
+        topic_df,
+        x='Subtopic',
+        y='Completion',
+        title=f"{topic_name} Progress",
+        color='Completion',
+        color_continuous_scale='Blues',
+        labels={"Completion": "Completion (%)"}
+    )
+    fig.update_layout(height=300)
+
+    return fig
+
+@memoize_figure
+def create_phase_bar_chart(phase_name, phase_progress):
+    phase_df = pd.DataFrame({
+        'Topic': list(phase_progress.keys()),
+        'Completion': list(phase_progress.values())
+    })
+
+    # Bar chart for detailed progress
+    fig = px.bar(
+        phase_df,
+        x='Topic',
+        y='Completion',
+        title=f"{phase_name} Topics Completion",
+        color='Completion',
+        color_continuous_scale='Blues',
+        text=[f"{v:.1f}%" for v in phase_df['Completion']]
+    )
+    fig.update_layout(height=350)
+
+    return fig
+
+@memoize_figure
+def create_phase_pie_chart(phase_name, phase_progress):
+    phase_df = pd.DataFrame({
+        'Topic': list(phase_progress.keys()),
+        'Completion': list(phase_progress.values())
+    })
+
+    # Pie chart for proportion
+    fig = px.pie(
+        phase_df,
+        values='Completion',
+        names='Topic',
+        title=f"{phase_name} Topics Distribution"
+    )
+    fig.update_layout(height=350)
+
+    return fig
+
+@memoize_figure
+def create_overall_bar_chart(current_track, overall_progress):
+    overall_df = pd.DataFrame({
+        'Phase': list(overall_progress.keys()),
+        'Completion': list(overall_progress.values())
+    })
+
+    # Bar chart for detailed progress
+    fig = px.bar(
+        overall_df,
+        x='Phase',
+        y='Completion',
+        title=f"{current_track} Overall Progress by Phase",
+        color='Completion',
+        color_continuous_scale='Blues',
+        text=[f"{v:.1f}%" for v in overall_df['Completion']]
+    )
+    fig.update_layout(height=400)
+
+    return fig
+
+@memoize_figure
+def create_overall_gauge_chart(total_completion):
+    # Create gauge chart for overall progress
+    fig = px.pie(
+        values=[total_completion, 100-total_completion],
+        names=["Completed", "Remaining"],
+        hole=0.7,
+        title=f"Overall Completion: {total_completion:.1f}%"
+    )
+    fig.update_layout(
+        height=400,
+        annotations=[dict(text=f"{total_completion:.1f}%", x=0.5, y=0.5, font_size=20, showarrow=False)]
+    )
+    fig.update_traces(marker=dict(colors=['#1f77b4', '#e0e0e0']))
+
+    return fig
+
+@memoize_figure
+def create_career_distribution_chart(student_df):
+    # Career path distribution
+    career_counts = student_df["Career Path"].value_counts().reset_index()
+    career_counts.columns = ["Career Path", "Count"]
+
+    return px.pie(
+        career_counts,
+        values="Count",
+        names="Career Path",
+        title="Career Path Distribution"
+    )
+
+@memoize_figure
+def create_career_average_chart(avg_by_career):
+    return px.bar(
+        avg_by_career,
+        x="Career Path",
+        y="Overall Progress",
+        title="Average Progress by Career Path",
+        color="Career Path",
+        text=[f"{v:.1f}%" for v in avg_by_career["Overall Progress"]]
+    )
+
+@memoize_figure
+def create_progress_histogram(student_df):
+    if len(student_df) > AGGREGATE_ABOVE:
+        # Bin on the server so the figure carries counts, not one value per student
+        edges = np.linspace(0, 100, 11)
+        fig = go.Figure()
+        for career_path, group in student_df.groupby("Career Path", sort=False):
+            counts, _ = np.histogram(group["Overall Progress"].dropna().clip(0, 100), bins=edges)
+            fig.add_trace(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=10, name=str(career_path)))
+        fig.update_layout(barmode="stack", title="Distribution of Student Progress",
+                          xaxis_title="Overall Progress", yaxis_title="count", legend_title="Career Path")
+        return fig
+
+    return px.histogram(
+        student_df,
+        x="Overall Progress",
+        nbins=10,
+        title="Distribution of Student Progress",
+        color="Career Path"
+    )
+
+@memoize_figure
+def create_comparison_chart(comparison_df):
+    if comparison_df["Student"].nunique() > AGGREGATE_ABOVE:
+        # Percentile bands per phase instead of one bar group per student
+        return _percentile_band_chart(
+            {phase: group["Progress"].to_numpy() for phase, group in comparison_df.groupby("Phase", sort=False)},
+            f"Student Progress by Phase ({comparison_df['Student'].nunique()} students)",
+            "Phase", "Completion (%)"
+        )
+
+    return px.bar(
+        comparison_df,
+        x="Student",
+        y="Progress",
+        color="Phase",
+        barmode="group",
+        title="Student Progress by Phase",
+        labels={"Progress": "Completion (%)"},
+        hover_data=["Career Path"]
+    )
@@ -0,0 +1,211 @@
+import atexit
+import copy
+import threading
+from collections import OrderedDict
+
+from app_logging import get_logger
+
+log = get_logger("write_behind")
+
+
+class FlushTimeoutError(Exception):
+    """Raised when queued writes are not stored within the flush timeout, e.g. while the store keeps failing"""
+
+
+class WriteBehindQueue:
+    """Coalesces progress and profile writes and commits them from one background thread.
+
+    Submitting returns as soon as the update is queued. Updates to the same
+    user and key are merged, latest values winning, and the writer commits
+    everything pending as one group commit (backend.save_progress_batches)
+    every interval seconds, or as soon as max_batch entries are waiting.
+    flush() blocks until everything queued so far is stored; close() runs
+    at interpreter exit so nothing queued is lost on shutdown.
+
+    Callers keep the version they read, so after the queue's own commits it
+    rebases later submissions onto the version it stored. Only the
+    max_rebase most recently committed keys are remembered; a submission
+    based on an older one fails the version check like writes from other
+    processes, and those keys are reported through conflicts().
+    """
+
+    def __init__(self, backend, interval=0.2, max_batch=500, max_rebase=10000):
+        self.backend = backend
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_rebase = max_rebase
+        self._cond = threading.Condition()
+        self._progress = {}
+        self._fields = {}
+        self._inflight = ({}, {})
+        self._rebase = OrderedDict()
+        self._conflicts = {}
+        self._submitted = 0
+        self._committed = 0
+        self._flush_requested = False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _pending_entries(self):
+        return sum(len(entries) for entries in self._progress.values())
+
+    def submit_progress(self, username, items):
+        """Queue (key, parts, entry) items for one user"""
+        with self._cond:
+            if self._closing:
+                # The writer is gone at shutdown; store directly
+                self.backend.save_progress_entries(username, items)
+                return
+            pending = self._progress.setdefault(username, {})
+            for key, parts, entry in items:
+                entry = copy.deepcopy(entry)
+                # The first queued version is the base the merged write is checked against
+                base = pending[key][2] if key in pending else entry.get("version")
+                pending[key] = (parts, entry, base)
+            self._submitted += 1
+            # Wakes the writer to open a batch window, or to commit at once when the batch is full
+            self._cond.notify_all()
+
+    def submit_fields(self, username, fields):
+        """Queue profile field updates for one user"""
+        with self._cond:
+            if self._closing:
+                self.backend.update_user_fields(username, fields)
+                return
+            self._fields.setdefault(username, {}).update(copy.deepcopy(fields))
+            self._submitted += 1
+            self._cond.notify_all()
+
+    def overlay(self, user_data, usernames=None):
+        """Apply queued and in-flight updates to a mutable {username: record} copy"""
+        with self._cond:
+            layers = (self._inflight, (self._progress, self._fields))
+            for progress, fields in layers:
+                for username, values in fields.items():
+                    if usernames is None or username in usernames:
+                        user_data.setdefault(username, {"career_path": None, "progress": {}}).update(values)
+                for username, entries in progress.items():
+                    if usernames is not None and username not in usernames:
+                        continue
+                    record = user_data.setdefault(username, {"career_path": None, "progress": {}})
+                    record_progress = record.setdefault("progress", {})
+                    for key, (_, entry, _) in entries.items():
+                        record_progress[key] = copy.deepcopy(entry)
+        return user_data
+
+    def conflicts(self, username):
+        """Return and forget the keys of username's queued writes that lost to another process"""
+        with self._cond:
+            return self._conflicts.pop(username, set())
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far is committed; return False on timeout"""
+        with self._cond:
+            target = self._submitted
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._committed >= target or not self._thread.is_alive(), timeout
+            ) and self._committed >= target
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._progress or self._fields or self._closing)
+                # Give the batch one interval to grow unless it is already full or someone is waiting
+                self._cond.wait_for(
+                    lambda: self._closing or self._flush_requested or self._pending_entries() >= self.max_batch,
+                    self.interval
+                )
+                progress, fields = self._progress, self._fields
+                self._progress, self._fields = {}, {}
+                self._inflight = (progress, fields)
+                self._flush_requested = False
+                target = self._submitted
+
+            committed = self._commit(progress, fields)
+
+            with self._cond:
+                self._inflight = ({}, {})
+                if committed:
+                    self._committed = target
+                elif self._closing:
+                    log.error("dropping queued writes at shutdown", users=len(progress), profiles=len(fields))
+                    self._committed = target
+                else:
+                    # Put the failed batch back under anything queued since
+                    for username, values in fields.items():
+                        self._fields[username] = {**values, **self._fields.get(username, {})}
+                    for username, entries in progress.items():
+                        self._progress[username] = {**entries, **self._progress.get(username, {})}
+                self._cond.notify_all()
+                if self._closing and not (self._progress or self._fields):
+                    return
+            if not committed:
+                # Back off before retrying a failing store
+                with self._cond:
+                    self._cond.wait(self.interval)
+
+    def _commit(self, progress, fields):
+        """Write one group commit; return False if the store failed and the batch must be retried"""
+        try:
+            for username, values in fields.items():
+                self.backend.update_user_fields(username, values)
+
+            batches = {}
+            for username, entries in progress.items():
+                items = []
+                for key, (parts, entry, base) in entries.items():
+                    entry = dict(entry)
+                    if base is not None:
+                        # Rebase onto our own earlier commit of this key
+                        previous = self._rebase.get((username, key))
+                        entry["version"] = previous[1] if previous and previous[0] == base else base
+                    else:
+                        entry.pop("version", None)
+                    items.append((key, parts, entry))
+                batches[username] = items
+            conflicts = self.backend.save_progress_batches(batches) if batches else {}
+        except Exception:
+            log.exception("write-behind commit failed", users=len(progress), profiles=len(fields))
+            return False
+
+        with self._cond:
+            for username, items in batches.items():
+                if username in conflicts:
+                    self._conflicts.setdefault(username, set()).update(conflicts[username])
+                    log.warning("queued update lost to another writer", username=username,
+                                keys=sorted(conflicts[username]))
+                    continue
+                for (key, _, entry), (_, _, base) in zip(items, progress[username].values()):
+                    self._rebase[(username, key)] = (base, entry["version"])
+                    self._rebase.move_to_end((username, key))
+            # Bounded so a long-running server does not remember every key ever saved
+            while len(self._rebase) > self.max_rebase:
+                self._rebase.popitem(last=False)
+        log.debug("write-behind commit", users=len(batches), entries=sum(len(items) for items in batches.values()))
+        return True
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def shared_queue(key, backend_factory, interval=0.2, max_batch=500):
+    """Return the process-wide queue for key, creating it (and its backend) on first use"""
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = _queues[key] = WriteBehindQueue(backend_factory(), interval, max_batch)
+        return queue